@@ -1,8 +1,11 @@
 import numpy as np
 import matplotlib.pyplot as plt
+from .raster import DensityRaster
+from .keyset import KeySet
+from .profiling import Stage
 
 class GraphDirectedIFS:
-    def __init__(self, d, n, edges):
+    def __init__(self, d, n, edges, probs=None):
         """
         Implements a GraphDirectedIFS in R^d.
         
@@ -17,7 +20,10 @@ class GraphDirectedIFS:
                           2: [(1, (A3, b3))]
                       }
         probs (dict): Optional dictionary mapping each vertex to a list of probabilities for each edge.
-                      If None, equal probabilities are assumed.
+                      If None, equal probabilities are assumed. If "spectral", every edge e: u -> v gets
+                      r_e^s h_v / h_u, where r_e is the ratio of its map, s the similarity dimension and
+                      h the Perron eigenvector of the Mauldin-Williams matrix; this spreads the points of
+                      the chaos game evenly over the attractor.
         
         Usage:
         Instead of providing functions for edges, provide (A, b) pairs. The class constructs the affine maps internally.
@@ -25,8 +31,31 @@ class GraphDirectedIFS:
         self.d = d
         self.vertices = list(range(1, n+1))
         self.edges = edges
+        self.probs = probs
+        self._compile_edges()
+
+    def _compile_edges(self):
+        """
+        Stack the maps of all edges into (E, d, d) and (E, d) arrays. Edges are sorted by source and,
+        within a source, by target (keeping their listed order otherwise), which is the order in which
+        contraction concatenates the images. `groups[i]` lists (target, first edge, last edge + 1)
+        for the runs of edges of vertex i with a common target.
+        """
+        self._order = order = [(i, k) for i in self.vertices
+                 for k in sorted(range(len(self.edges[i])), key=lambda k: self.edges[i][k][0])]
+        self.source = np.array([i for i, _ in order], dtype=np.int64)
+        self.target = np.array([self.edges[i][k][0] for i, k in order], dtype=np.int64)
+        self.linear = np.array([self.edges[i][k][1][0] for i, k in order], dtype=float).reshape(-1, self.d, self.d)
+        self.translation = np.array([self.edges[i][k][1][1] for i, k in order], dtype=float).reshape(-1, self.d)
+
+        self.groups = {i: [] for i in self.vertices}
+        for e, (i, j) in enumerate(zip(self.source, self.target)):
+            runs = self.groups[int(i)]
+            if runs and runs[-1][0] == j:
+                runs[-1][2] = e + 1
+            else:
+                runs.append([int(j), e, e + 1])
 
-    
     def contraction(self, Ks):
         """
         Apply the GD-IFS contraction F to a list of sets Ks = [K1, ..., Kn].
@@ -35,34 +64,287 @@ class GraphDirectedIFS:
 
         Returns: list of length n with the updated sets.
         """
+        # Points are stored coordinate-major: each new set is an (m, d) view of a (d, m) buffer, so every
+        # affine map is one matrix product writing contiguous rows straight into the buffer.
+        sizes = [len(K) for K in Ks]
         new_Ks = []
-        for i in self.vertices:
-            points = []
-            for j in self.vertices:
-                for edge in self.edges[i]:
-                    target, (A, b) = edge
-                    if target == j:
-                        # Apply affine map to all points in K_j
-                        K_j = Ks[j - 1]  # vertex indexing starts at 1
-                        mapped = (A @ K_j.T).T + b  # shape (m_j, d)
-                        points.append(mapped)
-            new_Ks.append(np.vstack(points))
-            
+        with Stage("GraphDirectedIFS", "contraction") as stage:
+            for i in self.vertices:
+                runs = self.groups[i]
+                out = np.empty((self.d, sum((stop - start) * sizes[j - 1] for j, start, stop in runs)))
+                offset = 0
+                for j, start, stop in runs:
+                    # all maps from i to j applied to K_j at once
+                    K_j = Ks[j - 1]  # vertex indexing starts at 1
+                    m = (stop - start) * len(K_j)
+                    block = out[:, offset:offset + m].reshape(self.d, stop - start, len(K_j)).transpose(1, 0, 2)
+                    np.matmul(self.linear[start:stop], K_j.T, out=block)
+                    block += self.translation[start:stop, :, None]
+                    offset += m
+                new_Ks.append(out.T)
+            stage.length = sum(len(K) for K in new_Ks)
+
         return new_Ks
 
-    def draw(self, vertex: int, iter, rotate_angle=0.0, ax = None, **plot_kwargs):
+    def ratios(self) -> np.ndarray:
+        """Contraction ratio |det A|^(1/d) of every edge map (in compiled order), exact for similarities."""
+        return np.abs(np.linalg.det(self.linear)) ** (1.0 / self.d)
+
+    def _ratio_matrix(self, s: float) -> np.ndarray:
+        # Mauldin-Williams matrix: M[u, v] = sum of r_e^s over the edges e: u -> v
+        M = np.zeros((len(self.vertices), len(self.vertices)))
+        np.add.at(M, (self.source - 1, self.target - 1), self.ratios() ** s)
+        return M
+
+    def similarity_dimension(self, tol: float = 1e-12) -> float:
+        """The s at which the spectral radius of the Mauldin-Williams matrix is 1, found by bisection."""
+        def radius(s):
+            return max(abs(np.linalg.eigvals(self._ratio_matrix(s))))
+        lo, hi = 0.0, 1.0
+        while radius(hi) > 1:
+            lo, hi = hi, 2 * hi
+        while hi - lo > tol:
+            mid = (lo + hi) / 2
+            lo, hi = (mid, hi) if radius(mid) > 1 else (lo, mid)
+        return (lo + hi) / 2
+
+    def edge_probabilities(self) -> np.ndarray:
+        """The probability of every edge (in compiled order) among the edges leaving its source."""
+        if self.probs is None:
+            counts = np.bincount(self.source, minlength=len(self.vertices) + 1)
+            return 1.0 / counts[self.source]
+        if isinstance(self.probs, str) and self.probs == "spectral":
+            s = self.similarity_dimension()
+            eigenvalues, eigenvectors = np.linalg.eig(self._ratio_matrix(s))
+            h = np.abs(eigenvectors[:, np.argmin(abs(eigenvalues - 1))].real)
+            # on a reducible graph h vanishes off the classes of dimension s; there r_e^s is used alone
+            h[h <= 1e-12 * h.max()] = 0.0
+            weights = self.ratios() ** s * np.where(h[self.source - 1] > 0, h[self.target - 1], 1.0)
+            totals = np.bincount(self.source, weights, minlength=len(self.vertices) + 1)
+            return weights / totals[self.source]
+        return np.array([self.probs[i][k] for i, k in self._order], dtype=float)
+
+    def chaos_game(self, n_points: int = None, chunk_size: int = 1 << 16, walkers: int = 1024,
+                   burn_in: int = 64, seed=None):
+        """
+        Random iteration: yield (labels, points) chunks of about `chunk_size` points, where points[k] lies
+        on the attractor K_labels[k], until `n_points` points are produced (forever if None).
+
+        `walkers` points are moved in parallel, the same number on every vertex. In every step a walker
+        on K_u picks an edge e: u -> v with its probability p_e and moves to T_e(y), where y is the
+        current point of a random walker on K_v. So every vertex gets points, also on reducible graphs,
+        and the points of K_u follow the invariant measure mu_u = sum over e: u -> v of p_e T_e(mu_v).
+        The first `burn_in` steps are discarded. Memory is fixed by `chunk_size` and `walkers`.
+        """
+        rng = np.random.default_rng(seed)
+        n = len(self.vertices)
+        p = self.edge_probabilities()
+        empty = [v for v in self.vertices if not np.any(self.source == v)]
+        if empty:
+            raise ValueError(f"vertices {empty} have no edges, their attractors are empty")
+
+        # 1. outgoing edges of every vertex with cumulative probabilities, padded to a table
+        outgoing = [np.flatnonzero(self.source == v) for v in self.vertices]
+        width = max(len(edges) for edges in outgoing)
+        table = np.zeros((n, width), dtype=np.int64)
+        cumulative = np.ones((n, width))
+        for u, edges in enumerate(outgoing):
+            table[u, :len(edges)] = edges
+            cumulative[u, :len(edges)] = np.cumsum(p[edges]) / p[edges].sum()
+            table[u, len(edges):] = edges[-1]
+
+        # 2. walkers, grouped by vertex: those of vertex v are start[v], ..., start[v] + count[v] - 1
+        count = np.full(n, max(1, walkers // n))
+        start = np.concatenate([[0], np.cumsum(count)[:-1]])
+        vertex = np.repeat(np.arange(n), count)
+        total = len(vertex)
+        x = np.zeros((total, self.d))
+
+        def step():
+            nonlocal x
+            k = (rng.random(total)[:, None] >= cumulative[vertex]).sum(axis=1)
+            e = table[vertex, np.minimum(k, width - 1)]
+            v = self.target[e] - 1
+            y = x[start[v] + (rng.random(total) * count[v]).astype(np.int64)]
+            x = np.matmul(self.linear[e], y[:, :, None])[:, :, 0] + self.translation[e]
+
+        for _ in range(burn_in):
+            step()
+        steps = max(1, chunk_size // total)
+        produced = 0
+        while n_points is None or produced < n_points:
+            labels = np.empty((steps, total), dtype=np.int64)
+            points = np.empty((steps, total, self.d))
+            for t in range(steps):
+                step()
+                labels[t], points[t] = vertex + 1, x
+            m = steps * total if n_points is None else min(steps * total, n_points - produced)
+            produced += m
+            yield labels.reshape(-1)[:m], points.reshape(-1, self.d)[:m]
+
+    def raster(self, n_points: int, size: int = 1024, vertices=None, seed: int = 0, **chaos_kwargs) -> DensityRaster:
+        """
+        Run the chaos game for `n_points` points and bin them into a DensityRaster with one channel per
+        vertex in `vertices` (default: all), each point inking about one pixel. The bounds come from a
+        first run with the same seed, so the game is played twice but never held in memory.
+        """
+        vertices = list(self.vertices if vertices is None else vertices)
+        lo, hi = np.full(self.d, np.inf), np.full(self.d, -np.inf)
+        for labels, points in self.chaos_game(n_points, seed=seed, **chaos_kwargs):
+            points = points[np.isin(labels, vertices)]
+            if len(points):
+                lo, hi = np.minimum(lo, points.min(axis=0)), np.maximum(hi, points.max(axis=0))
+        raster = DensityRaster((lo[0], lo[1], hi[0], hi[1]), size, len(vertices))
+        for labels, points in self.chaos_game(n_points, seed=seed, **chaos_kwargs):
+            for channel, v in enumerate(vertices):
+                mine = points[labels == v]
+                raster.add_points(channel, mine, np.full(len(mine), raster.pixel))
+        return raster
+
+    def bounding_balls(self, max_points: int = 1 << 16, tol: float = 1e-12) -> tuple:
+        """
+        Centres c and radii R with K_v inside the ball B(c_v, R_v) for every vertex v. The centres are the
+        means of a few deterministic iterates; the radii are the least solution of
+        R_u = max over edges e: u -> v of |T_e(c_v) - c_u| + ||A_e|| R_v, found by fixed-point iteration.
+        """
+        Ks = [np.zeros((1, self.d)) for _ in self.vertices]
+        while sum(len(K) for K in Ks) * len(self.source) <= max_points:
+            Ks = self.contraction(Ks)
+        centres = np.array([K.mean(axis=0) for K in Ks])
+        norms = np.linalg.norm(self.linear, ord=2, axis=(1, 2))
+        mapped = np.matmul(self.linear, centres[self.target - 1][:, :, None])[:, :, 0] + self.translation
+        offsets = np.linalg.norm(mapped - centres[self.source - 1], axis=1)
+        radii = np.zeros(len(self.vertices))
+        for _ in range(100000):
+            new = np.zeros_like(radii)
+            np.maximum.at(new, self.source - 1, offsets + norms * radii[self.target - 1])
+            if np.all(np.abs(new - radii) <= tol * max(1.0, new.max())):
+                return centres, new
+            radii = new
+        raise ValueError("the IFS is not contracting, its attractors have no bounding balls")
+
+    def bounding_box(self, vertex: int, max_points: int = 1 << 16) -> tuple:
+        """
+        A bounding box (xmin, ymin, xmax, ymax) of K_vertex (d = 2): the bounding balls mapped along all
+        paths of k edges from `vertex`, for the deepest k with at most `max_points` paths. Their centres
+        are iterated exactly, their radii bounded by ||A||^k R.
+        """
+        centres, radii = self.bounding_balls()
+        norm = np.linalg.norm(self.linear, ord=2, axis=(1, 2)).max()
+        Ks = [c[None] for c in centres]
+        k = 0
+        while sum(len(K) for K in Ks) * len(self.source) <= max_points:
+            Ks = self.contraction(Ks)
+            k += 1
+        K = Ks[vertex - 1]
+        r = norm ** k * radii.max()
+        lo, hi = K.min(axis=0) - r, K.max(axis=0) + r
+        return lo[0], lo[1], hi[0], hi[1]
+
+    def window_points(self, vertex: int, window, resolution: int = 1024, iter: int = None,
+                      precision: float = 1 / 64) -> np.ndarray:
+        """
+        The pixels of `window` = (xmin, ymin, xmax, ymax), at `resolution` pixels along its longer side,
+        that the attractor K_vertex reaches, as an (m, 2) array of pixel centres.
+
+        The cylinders T_e1...T_ek(K_v) are expanded top-down, one level at a time: a cylinder is dropped
+        when its bounding ball misses the window, and duplicate cylinders (the same vertex, linear part and
+        position, up to rounding) are merged. A cylinder whose ball lies inside one pixel marks that pixel,
+        which K_vertex certainly reaches. Only cylinders straddling pixel borders are expanded further,
+        until their balls are within `precision` pixels (or after `iter` levels), when they mark the pixel
+        of their centre; so a pixel is missed, or a neighbour marked, only where K_vertex comes within
+        `precision` pixels of a pixel border. The work per level depends on the resolution, not on the depth.
+        """
+        xmin, ymin, xmax, ymax = window
+        pixel = max(xmax - xmin, ymax - ymin) / resolution
+        centres, radii = self.bounding_balls()
+        norms = np.linalg.norm(self.linear, ord=2, axis=(1, 2))
+        width, height = int(np.ceil((xmax - xmin) / pixel)), int(np.ceil((ymax - ymin) / pixel))
+
+        linear = np.identity(self.d)[None]
+        translation = np.zeros((1, self.d))
+        scale = np.ones(1)
+        vert = np.array([vertex - 1])
+        pixels = KeySet()
+        depth = 0
+        while len(vert):
+            c = np.matmul(linear, centres[vert][:, :, None])[:, :, 0] + translation
+            r = scale * radii[vert]
+
+            # 1. drop cylinders whose ball misses the window
+            keep = (c[:, 0] + r >= xmin) & (c[:, 0] - r <= xmax) & (c[:, 1] + r >= ymin) & (c[:, 1] - r <= ymax)
+            low = np.floor((c - r[:, None] - (xmin, ymin)) / pixel).astype(np.int64)
+            high = np.floor((c + r[:, None] - (xmin, ymin)) / pixel).astype(np.int64)
+            done = keep & (np.all(low == high, axis=1) | (r <= precision * pixel) | (depth == iter))
+
+            # 2. mark the pixels of the cylinders inside a pixel (or small enough)
+            ij = np.floor((c[done] - (xmin, ymin)) / pixel).astype(np.int64)
+            inside = (ij[:, 0] >= 0) & (ij[:, 0] < width) & (ij[:, 1] >= 0) & (ij[:, 1] < height)
+            pixels.add((ij[inside, 0] << 32) | ij[inside, 1])
+
+            # 3. merge duplicate cylinders
+            live = np.flatnonzero(keep & ~done)
+            if len(live) == 0:
+                break
+            q = np.round(c[live] / (pixel * 1e-6)).astype(np.int64)  # equal up to rounding, not merely close
+            shape = np.round(linear[live].reshape(len(live), -1) / scale[live, None] * (1 << 20)).astype(np.int64)
+            rows = np.column_stack([vert[live], q, shape])
+            # rows with equal hashes (products wrap around) are compared in full, so a collision never
+            # merges distinct cylinders
+            hashes = rows @ (np.random.default_rng(0).integers(1, 1 << 62, rows.shape[1], dtype=np.int64) | 1)
+            _, first, group = np.unique(hashes, return_index=True, return_inverse=True)
+            first = first[group]
+            duplicate = (first != np.arange(len(rows))) & np.all(rows == rows[first], axis=1)
+            live = live[~duplicate]
 
+            # 4. expand every remaining cylinder along the edges leaving its vertex
+            parts = [[], [], [], []]
+            for e in range(len(self.source)):
+                sel = live[vert[live] == self.source[e] - 1]
+                if len(sel):
+                    parts[0].append(np.matmul(linear[sel], self.linear[e]))
+                    parts[1].append(np.matmul(linear[sel], self.translation[e]) + translation[sel])
+                    parts[2].append(scale[sel] * norms[e])
+                    parts[3].append(np.full(len(sel), self.target[e] - 1))
+            linear, translation, scale, vert = (np.concatenate(part) for part in parts)
+            depth += 1
+
+        keys = pixels.keys()
+        return (np.column_stack([keys >> 32, keys & 0xFFFFFFFF]) + 0.5) * pixel + (xmin, ymin)
+
+    def draw(self, vertex: int, iter=25, rotate_angle=0.0, ax = None, points: int = None, window=None,
+             resolution: int = 1024, **plot_kwargs):
+        """
+        Scatter plot of the attractor K_vertex: by `iter` rounds of deterministic iteration from the origin,
+        or, if `points` is given, by that many points of the chaos game, or, if `window` is given, by the
+        occupied pixels of that window at `resolution` (see window_points).
+        """
         if ax is None:
             fig, ax = plt.subplots()
 
-        # Initialize Ks with the origin for each vertex
-        Ks = [np.array([[0.0, 0.0]]) for _ in self.vertices]
-                # Apply contraction iter times
-        for _ in range(iter):
-            Ks = self.contraction(Ks)
+        if window is not None:
+            points = self.window_points(vertex, window, resolution)
+        elif points is not None:
+            if vertex not in self.vertices:
+                raise ValueError(f"no vertex {vertex}, the vertices are {self.vertices}")
+            # Collect the chaos-game points that land on the requested vertex
+            chunks, count = [], 0
+            for labels, chunk in self.chaos_game():
+                chunk = chunk[labels == vertex]
+                chunks.append(chunk[:points - count])
+                count += len(chunks[-1])
+                if count == points:
+                    break
+            points = np.vstack(chunks)
+        else:
+            # Initialize Ks with the origin for each vertex
+            Ks = [np.array([[0.0, 0.0]]) for _ in self.vertices]
+            # Apply contraction iter times
+            for _ in range(iter):
+                Ks = self.contraction(Ks)
 
-        # Plot the points of the specified vertex
-        points = Ks[vertex - 1]  # vertex indexing starts at 1
+            # Plot the points of the specified vertex
+            points = Ks[vertex - 1]  # vertex indexing starts at 1
 
         # Optionally rotate points through rotate_angle
         if rotate_angle != 0.0:
@@ -0,0 +1,283 @@
+"""
+Benchmarks of the hot paths, with their scaling in the level n and the folding-sequence length.
+
+Every case prepares its input untimed and then times one call of a hot path: the folding morphism,
+backtracking reduction, the boundary morphism, the SVG path writer and the IFS contraction across
+levels n, and the boundary-rule derivation and adjacency matrix across sequence lengths. A case is run
+`repeat` times and the best wall time is kept; the peak memory of one more run is measured with
+tracemalloc (which also sees NumPy's buffers). The scaling exponents of time and peak memory in the
+input size are fitted on log-log axes, the results are written as JSON, and a baseline file from an
+earlier run can be compared against to report regressions.
+
+Usage:
+    python -m foldingcurves.benchmark --output benchmark.json
+    python -m foldingcurves.benchmark --baseline benchmark.json --output new.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+import numpy as np
+from .squaregrid import FoldingSequence, draw_sqauregrid_word, clear_rules
+from .IFS import GraphDirectedIFS
+from .dimension import fit_slope
+from . import svg
+
+# The folding sequences of the notebook
+NOTEBOOK_SEQUENCES = ("+", "-++", "+---+++---++")
+
+
+def dragon_ifs() -> GraphDirectedIFS:
+    """The graph-directed IFS of the boundary of Heighway's dragon, as constructed in the notebook."""
+    R = np.array([[0, -1], [1, 0]])
+    L_inv = np.linalg.inv(np.array([[1, 1], [-1, 1]]))
+    e1, e2, zero = np.array([1, 0]), np.array([0, 1]), np.zeros(2)
+    edges = {1: [(1, (L_inv, zero)), (2, (L_inv @ R, L_inv @ (e1 - e2)))],
+             2: [(3, (L_inv @ R, zero))],
+             3: [(1, (L_inv @ R @ R, zero)), (1, (L_inv, L_inv @ (-2 * e1)))]}
+    return GraphDirectedIFS(2, 3, edges)
+
+
+# ---------------- Cases ----------------
+# A case maps (folding sequence, n) to (run, size): `run` is the call to time and `size` the number of
+# symbols (or points) it produces. Level cases are swept over n, length cases over the sequence length.
+
+def _folding_morphism(sequence: str, n: int) -> tuple:
+    s = FoldingSequence(sequence)
+    w = s.word(n - 1)
+    return (lambda: s.folding_morphism(w)), s.word_length(n)
+
+
+def _reduce_backtracking(sequence: str, n: int) -> tuple:
+    s = FoldingSequence(sequence)
+    w = s.create_left(s.word(n))
+    return (lambda: s.reduce_backtracking(w)), len(w)
+
+
+def _boundary_morphism(sequence: str, n: int) -> tuple:
+    s = FoldingSequence(sequence)
+    w = s.word(n - 1, "R")
+    return (lambda: s.boundary_morphism(w)), s.word_length(n, "R")
+
+
+def _svg_path(sequence: str, n: int) -> tuple:
+    s = FoldingSequence(sequence)
+    w = s.word(n)
+
+    def run():
+        with svg.SVGWriter(os.devnull) as writer:
+            draw_sqauregrid_word(w, step=12.0, writer=writer)
+    return run, len(w)
+
+
+def _ifs_contraction(sequence: str, n: int) -> tuple:
+    ifs = dragon_ifs()
+    Ks = [np.zeros((1, 2)) for _ in ifs.vertices]
+    for _ in range(n - 1):
+        Ks = ifs.contraction(Ks)
+    return (lambda: ifs.contraction(Ks)), sum(len(K) for K in ifs.contraction(Ks))
+
+
+def _boundary_rules(sequence: str, n: int) -> tuple:
+    s = FoldingSequence(sequence)
+    return s.compile_rules, len(sequence)
+
+
+def _adjacency_matrix(sequence: str, n: int) -> tuple:
+    s = FoldingSequence(sequence)
+    s.rules  # derived once, untimed
+    return s.boundary_morphism_adjacency_matrix, len(sequence)
+
+
+LEVEL_CASES = {
+    "folding_morphism": _folding_morphism,
+    "reduce_backtracking": _reduce_backtracking,
+    "boundary_morphism": _boundary_morphism,
+    "svg_path": _svg_path,
+    "ifs_contraction": _ifs_contraction,  # the dragon's IFS, independent of the sequence
+}
+LENGTH_CASES = {
+    "boundary_rules": _boundary_rules,
+    "adjacency_matrix": _adjacency_matrix,
+}
+
+
+def measure(run, repeat: int = 3) -> tuple:
+    """Best wall time of `repeat` calls of `run`, and the peak memory traced during one more call."""
+    seconds = np.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        seconds = min(seconds, time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return seconds, peak
+
+
+def random_sequences(count: int, min_length: int, max_length: int, seed: int = 0) -> list:
+    """`count` random folding sequences with lengths in [min_length, max_length]."""
+    rng = random.Random(seed)
+    return ["".join(rng.choice("+-") for _ in range(rng.randint(min_length, max_length)))
+            for _ in range(count)]
+
+
+def levels(sequence: str, case: str, min_size: int, max_size: int) -> range:
+    """The levels n >= 1 of a level case whose output size lies in [min_size, max_size]."""
+    if case == "ifs_contraction":
+        # K_i after n contractions has one point per path of n edges from i
+        ifs = dragon_ifs()
+        paths = np.zeros((len(ifs.vertices),) * 2, dtype=np.int64)
+        np.add.at(paths, (ifs.source - 1, ifs.target - 1), 1)
+        counts = [len(ifs.vertices)]
+        while counts[-1] <= max_size:
+            counts.append(int(np.linalg.matrix_power(paths, len(counts)).sum()))
+        size = lambda n: counts[n]
+    else:
+        s = FoldingSequence(sequence)
+        seed = "R" if case == "boundary_morphism" else "A"
+        size = lambda n: s.word_length(n, seed)
+    n = 1
+    while size(n) < min_size:
+        n += 1
+    top = n - 1
+    while size(top + 1) <= max_size:
+        top += 1
+    return range(n, top + 1)
+
+
+def run_benchmarks(sequences=NOTEBOOK_SEQUENCES, cases=None, min_size: int = 1 << 10,
+                   max_size: int = 1 << 18, lengths=(4, 8, 16, 32, 64, 128, 256), repeat: int = 3,
+                   seed: int = 0, log=None) -> list:
+    """
+    Run the benchmark cases and return one record per measurement: case, sequence, n, size, seconds
+    and peak_bytes. Level cases are run for every sequence (the IFS case only once, for "+") over the
+    levels with output size in [min_size, max_size]; length cases for a random sequence of every length.
+    """
+    names = cases or list(LEVEL_CASES) + list(LENGTH_CASES)
+    records = []
+
+    def record(case, sequence, n, setup):
+        run, size = setup(sequence, n)
+        seconds, peak = measure(run, repeat)
+        records.append({"case": case, "sequence": sequence, "n": n, "size": int(size),
+                        "seconds": seconds, "peak_bytes": int(peak)})
+        if log is not None:
+            label = sequence if len(sequence) <= 16 else sequence[:13] + "..."
+            log(f"{case:20s} {label:>16s} n={n:<3d} size={size:<10d} {seconds * 1e3:10.3f} ms "
+                f"{peak / 2**20:9.2f} MiB")
+
+    for case in names:
+        if case in LEVEL_CASES:
+            for sequence in (["+"] if case == "ifs_contraction" else sequences):
+                for n in levels(sequence, case, min_size, max_size):
+                    record(case, sequence, n, LEVEL_CASES[case])
+        elif case in LENGTH_CASES:
+            for m in lengths:
+                sequence = random_sequences(1, m, m, seed + m)[0]
+                clear_rules(sequence)
+                record(case, sequence, 0, LENGTH_CASES[case])
+        else:
+            raise ValueError(f"unknown case {case!r}")
+    return records
+
+
+def fit_scaling(records: list) -> list:
+    """
+    Scaling exponents of time and peak memory in the output size, per case and series (a sequence
+    for level cases, "random" for length cases), from the slope on log-log axes.
+    """
+    series = {}
+    for r in records:
+        key = (r["case"], r["sequence"] if r["case"] in LEVEL_CASES else "random")
+        series.setdefault(key, []).append(r)
+    fits = []
+    for (case, sequence), rs in series.items():
+        if len(rs) < 2:
+            continue
+        size = np.log([r["size"] for r in rs])
+        fit = {"case": case, "sequence": sequence, "points": len(rs)}
+        for name, field in (("time", "seconds"), ("memory", "peak_bytes")):
+            values = np.array([max(r[field], 1e-9) for r in rs], dtype=float)
+            result = fit_slope(size, np.log(values))
+            fit[name] = {"exponent": result["dimension"], "low": result["low"], "high": result["high"]}
+        fits.append(fit)
+    return fits
+
+
+def compare(records: list, baseline: list, tolerance: float = 1.25, min_seconds: float = 1e-3) -> list:
+    """
+    Regressions against a baseline: measurements (matched by case, sequence and n) whose time or
+    peak memory grew by more than the factor `tolerance`. Times below `min_seconds` are too noisy
+    to compare and are skipped.
+    """
+    before = {(r["case"], r["sequence"], r["n"]): r for r in baseline}
+    regressions = []
+    for r in records:
+        b = before.get((r["case"], r["sequence"], r["n"]))
+        if b is None:
+            continue
+        for field in ("seconds", "peak_bytes"):
+            if b[field] <= 0 or (field == "seconds" and b[field] < min_seconds):
+                continue
+            ratio = r[field] / b[field]
+            if ratio > tolerance:
+                regressions.append({"case": r["case"], "sequence": r["sequence"], "n": r["n"],
+                                    "field": field, "baseline": b[field], "value": r[field], "ratio": ratio})
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the hot paths of foldingcurves.")
+    parser.add_argument("--output", default="benchmark.json", help="JSON file for the results")
+    parser.add_argument("--baseline", default=None, help="earlier results to report regressions against")
+    parser.add_argument("--cases", nargs="*", default=None,
+                        help=f"cases to run (default: all of {', '.join(list(LEVEL_CASES) + list(LENGTH_CASES))})")
+    parser.add_argument("--sequences", nargs="*", default=list(NOTEBOOK_SEQUENCES),
+                        help="folding sequences of the level cases")
+    parser.add_argument("--random", type=int, default=2, help="number of random sequences added")
+    parser.add_argument("--random-length", type=int, default=12, help="longest random sequence")
+    parser.add_argument("--min-size", type=int, default=1 << 10, help="smallest output size of a level case")
+    parser.add_argument("--max-size", type=int, default=1 << 18, help="largest output size of a level case")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per measurement (the best is kept)")
+    parser.add_argument("--tolerance", type=float, default=1.25, help="slowdown factor reported as a regression")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the random sequences")
+    args = parser.parse_args(argv)
+
+    sequences = args.sequences + random_sequences(args.random, 2, args.random_length, args.seed)
+    records = run_benchmarks(sequences, args.cases, args.min_size, args.max_size,
+                             repeat=args.repeat, seed=args.seed, log=print)
+    fits = fit_scaling(records)
+    for fit in fits:
+        print(f"{fit['case']:20s} {fit['sequence']:>16s} time ~ size^{fit['time']['exponent']:.2f}  "
+              f"memory ~ size^{fit['memory']['exponent']:.2f}")
+    results = {"meta": {"python": platform.python_version(), "numpy": np.__version__,
+                        "platform": platform.platform(), "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                        "repeat": args.repeat},
+               "records": records, "fits": fits}
+
+    status = 0
+    if args.baseline is not None:
+        with open(args.baseline) as f:
+            regressions = compare(records, json.load(f)["records"], args.tolerance)
+        results["regressions"] = regressions
+        for r in regressions:
+            print(f"REGRESSION {r['case']} {r['sequence']} n={r['n']} {r['field']}: "
+                  f"{r['baseline']:.4g} -> {r['value']:.4g} ({r['ratio']:.2f}x)")
+        print(f"{len(regressions)} regressions against {args.baseline}")
+        status = 1 if regressions else 0
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=1)
+    print(f"results in {args.output}")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+"""
+A cache of morphism iterates P^k(c) for the letters c of a folding sequence's rules.
+
+Level k+1 of a letter is the concatenation of the level-k words of the letters of its rule, so asking
+for P^k(A) after P^(k-1)(A) costs one level, not k. Words are held as uint8 arrays in least-recently-used
+order and evicted once they exceed `max_bytes`. With a `spill_dir`, words of at least `spill_bytes` are
+also written to disk, one raw file per (sequence, letter, level), and reopened as read-only memory maps;
+later processes find the files by the folding sequence and map them without rebuilding or copying.
+"""
+import os
+from collections import OrderedDict
+import numpy as np
+from .word import Word
+
+
+def sequence_key(folding_sequence: str) -> str:
+    """File-system safe name of a folding sequence ('+' -> 'p', '-' -> 'm')."""
+    return folding_sequence.replace("+", "p").replace("-", "m")
+
+
+class LevelCache:
+    def __init__(self, max_bytes: int = 1 << 30, spill_dir: str = None, spill_bytes: int = 1 << 24):
+        """
+        Parameters:
+        max_bytes (int): bound on the bytes of words held in memory (memory-mapped words are not counted).
+        spill_dir (str): directory for memory-mapped words; None keeps everything in memory.
+        spill_bytes (int): words at least this long are written to `spill_dir`.
+        """
+        self.max_bytes = max_bytes
+        self.spill_dir = spill_dir
+        self.spill_bytes = spill_bytes
+        self._words = OrderedDict()  # (sequence, letter, k) -> uint8 array, least recently used first
+        self.nbytes = 0  # bytes of the in-memory (not memory-mapped) words
+
+    def _path(self, key: tuple) -> str:
+        sequence, letter, k = key
+        return os.path.join(self.spill_dir, sequence_key(sequence), f"{k:03d}_{ord(letter)}.u8")
+
+    def _lookup(self, key: tuple):
+        codes = self._words.get(key)
+        if codes is not None:
+            self._words.move_to_end(key)
+            return codes
+        if self.spill_dir is not None and os.path.exists(self._path(key)):
+            codes = self._remember(key, self._open(key))
+        return codes
+
+    def _open(self, key: tuple) -> np.ndarray:
+        path = self._path(key)
+        if os.path.getsize(path) == 0:  # np.memmap cannot map empty files
+            return np.zeros(0, dtype=np.uint8)
+        return np.memmap(path, dtype=np.uint8, mode="r")
+
+    def _remember(self, key: tuple, codes: np.ndarray) -> np.ndarray:
+        if self.spill_dir is not None and len(codes) >= self.spill_bytes and not isinstance(codes, np.memmap):
+            # write once (atomically, for concurrent processes) and keep only the map
+            path = self._path(key)
+            if not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                codes.tofile(path + f".{os.getpid()}.tmp")
+                os.replace(path + f".{os.getpid()}.tmp", path)
+            codes = self._open(key)
+        self._words[key] = codes
+        if not isinstance(codes, np.memmap):
+            self.nbytes += codes.nbytes
+        # evict the least recently used words, never the one just added
+        while self.nbytes > self.max_bytes and len(self._words) > 1:
+            _, old = self._words.popitem(last=False)
+            if not isinstance(old, np.memmap):
+                self.nbytes -= old.nbytes
+        return codes
+
+    def codes(self, folding_sequence, letter: str, k: int) -> np.ndarray:
+        """P^k(letter) (or P1^k(letter) for a boundary letter) of a FoldingSequence, as a uint8 array."""
+        key = (folding_sequence.folding_sequence, letter, k)
+        codes = self._lookup(key)
+        if codes is not None:
+            return codes
+        rules = folding_sequence.rules
+        rule = rules.P0 if letter in rules.P0 else rules.P1
+        if k == 0 or letter not in rule:  # letters without a rule ('+', '-') are fixed
+            return Word(letter).codes
+        below = {c: self.codes(folding_sequence, c, k - 1) for c in set(rule[letter])}
+        parts = [below[c] for c in rule[letter]]
+        codes = np.concatenate(parts) if parts else np.zeros(0, dtype=np.uint8)
+        return self._remember(key, codes)
+
+    def word(self, folding_sequence, letter: str, k: int) -> Word:
+        """P^k(letter) (or P1^k(letter) for a boundary letter) of a FoldingSequence, as a Word."""
+        return Word(self.codes(folding_sequence, letter, k))
+
+    def clear(self) -> None:
+        """Forget the words held in memory; spilled files stay on disk."""
+        self._words.clear()
+        self.nbytes = 0
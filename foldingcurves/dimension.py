@@ -0,0 +1,164 @@
+"""
+Numerical dimension estimates from streams of points, to check the theoretical dimension
+log(rho(M)) / log|end(P(A))| of a boundary against its actual geometry.
+
+Box counting quantises every point once to an integer grid of 2^levels boxes per side; the box at a
+coarser level is found by shifting the integer coordinates, and the occupied boxes of each level are
+kept as sorted unique keys (KeySet). Mass counting tallies the points within geometrically spaced radii
+of a few centres. Both consume points chunk by chunk in a single pass over a grid fixed by bounds known
+in advance (the bounding box of an IFS attractor, or of a curve from its level matrices), so every
+stream is generated once and memory depends on the number of occupied boxes, not on the number of points. The slope of log(count) against log(scale) is fitted
+by least squares with a 95% confidence interval.
+"""
+import numpy as np
+from .keyset import KeySet
+from .raster import polyline_bounds
+
+# Two-sided 95% quantiles of Student's t distribution for 1..30 degrees of freedom
+T_95 = (12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+        2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+        2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042)
+
+
+def fit_slope(x: np.ndarray, y: np.ndarray) -> dict:
+    """Least-squares slope of y against x with its standard error and 95% confidence interval."""
+    x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+    if len(x) < 2:
+        raise ValueError("at least two scales are needed to fit a dimension")
+    A = np.vstack([x, np.ones_like(x)]).T
+    (slope, intercept), *_ = np.linalg.lstsq(A, y, rcond=None)
+    dof = len(x) - 2
+    if dof > 0:
+        residual = y - (slope * x + intercept)
+        stderr = float(np.sqrt(residual @ residual / dof / np.sum((x - x.mean()) ** 2)))
+        t = T_95[dof - 1] if dof <= len(T_95) else 1.96
+    else:
+        stderr, t = float("nan"), float("nan")
+    return {"dimension": float(slope), "stderr": stderr,
+            "low": float(slope - t * stderr), "high": float(slope + t * stderr)}
+
+
+class BoxCounter:
+    def __init__(self, bounds, levels: int = 12):
+        """
+        Parameters:
+        bounds (tuple): (xmin, ymin, xmax, ymax) containing all points; points outside are clamped.
+        levels (int): finest level; level k has boxes of side (longer side of bounds) / 2^k.
+        """
+        xmin, ymin, xmax, ymax = bounds
+        self.levels = levels
+        self.origin = np.array([xmin, ymin], dtype=float)
+        self.side = max(xmax - xmin, ymax - ymin) or 1.0
+        self.boxes = [KeySet() for _ in range(levels + 1)]
+        self.points = 0
+
+    def add(self, points: np.ndarray) -> None:
+        """Count the boxes occupied by a chunk of (m, 2) points at every level."""
+        self.points += len(points)
+        cells = 1 << self.levels
+        q = np.floor((points - self.origin) * (cells / self.side)).astype(np.int64)
+        np.clip(q, 0, cells - 1, out=q)
+        # finest boxes first; each coarser level only shifts the distinct boxes of the finer one
+        keys = np.unique((q[:, 0] << 32) | q[:, 1])
+        for k in range(self.levels, -1, -1):
+            self.boxes[k].add(keys)
+            keys = np.unique(((keys >> 33) << 32) | ((keys & 0xFFFFFFFF) >> 1))
+
+    def counts(self) -> tuple:
+        """Box sides and the number of occupied boxes, for levels 0..levels."""
+        sides = self.side / 2.0 ** np.arange(self.levels + 1)
+        return sides, np.array([len(boxes) for boxes in self.boxes])
+
+    def fit(self, first: int = None, last: int = None) -> dict:
+        """
+        Box-counting dimension: slope of log N(e) against log(1/e) over levels first..last. By default
+        levels with fewer than 16 boxes (too coarse) or more than points/16 boxes (too few points per
+        box to fill them) are left out.
+        """
+        sides, counts = self.counts()
+        k = np.arange(self.levels + 1)
+        use = (counts >= 16) & (counts <= self.points / 16)
+        if first is not None:
+            use &= k >= first
+        if last is not None:
+            use &= k <= last
+        result = fit_slope(-np.log(sides[use]), np.log(counts[use]))
+        result.update(method="box", levels=k[use].tolist(), counts=counts[use].tolist())
+        return result
+
+
+class MassCounter:
+    def __init__(self, centres: np.ndarray, r_min: float, r_max: float, radii: int = 24):
+        """
+        Parameters:
+        centres (np.ndarray): (c, 2) points of the set around which the mass is counted.
+        r_min, r_max (float): smallest and largest radius.
+        radii (int): number of geometrically spaced radii.
+        """
+        self.centres = np.asarray(centres, dtype=float)
+        self.radii = np.geomspace(r_min, r_max, radii)
+        self.mass = np.zeros((len(self.centres), radii), dtype=np.int64)
+
+    def add(self, points: np.ndarray) -> None:
+        """Count the points of a chunk within each radius of each centre."""
+        for c, centre in enumerate(self.centres):
+            d = np.hypot(*(points - centre).T)
+            self.mass[c] += np.bincount(np.searchsorted(self.radii, d), minlength=len(self.radii) + 1)[:-1]
+
+    def fit(self) -> dict:
+        """Mass dimension: slope of log M(r), averaged over the centres, against log r."""
+        mass = np.cumsum(self.mass, axis=1).mean(axis=0)
+        use = mass > 0
+        result = fit_slope(np.log(self.radii[use]), np.log(mass[use]))
+        result.update(method="mass", radii=self.radii[use].tolist(), counts=mass[use].tolist())
+        return result
+
+
+def estimate_dimension(make_chunks, levels: int = 12, centres: int = 8, mass: bool = True,
+                       bounds: tuple = None) -> dict:
+    """
+    Box-counting (and mass) dimension of the points produced by `make_chunks()`, a function returning
+    a fresh iterator of (m, 2) arrays. With `bounds` = (xmin, ymin, xmax, ymax) around all the points
+    it is called once; without, it is called a second time, first, to find the bounds.
+    The mass centres are the first points of the stream; radii run from 1/2^levels to 1/4 of the extent.
+    """
+    if bounds is None:
+        bounds = polyline_bounds(make_chunks())
+    boxes = BoxCounter(bounds, levels)
+    side = boxes.side
+    masses = None
+    for points in make_chunks():
+        if mass and masses is None and len(points):
+            masses = MassCounter(points[np.linspace(0, len(points) - 1, centres).astype(int)],
+                                 side / 2 ** levels, side / 4)
+        boxes.add(points)
+        if masses is not None:
+            masses.add(points)
+    result = {"box": boxes.fit()}
+    if masses is not None:
+        result["mass"] = masses.fit()
+    return result
+
+
+def ifs_dimension(ifs, vertex: int, n_points: int = 10 ** 7, levels: int = 12, seed: int = 0, **kwargs) -> dict:
+    """Dimension estimates of the attractor K_vertex of a GraphDirectedIFS from its chaos game."""
+    if vertex not in ifs.vertices:
+        raise ValueError(f"no vertex {vertex}, the vertices are {ifs.vertices}")
+    def make_chunks():
+        for labels, points in ifs.chaos_game(n_points, seed=seed):
+            yield points[labels == vertex]
+    return estimate_dimension(make_chunks, levels, bounds=ifs.bounding_box(vertex), **kwargs)
+
+
+def boundary_dimension(folding_sequence, n: int, seed: str = "R", levels: int = None, **kwargs) -> dict:
+    """
+    Dimension estimates of the boundary curve P1^n(seed) of a FoldingSequence from its vertices.
+    By default the finest boxes are about four half grid steps wide, where the curve still looks fractal.
+    """
+    if levels is None:
+        x, y = folding_sequence.end_point(1)
+        levels = max(2, int(np.log2(np.hypot(x, y) ** n / 2)))
+
+    def make_chunks():
+        return folding_sequence.curve_points(n, seed, step=1.0)
+    return estimate_dimension(make_chunks, levels, bounds=folding_sequence.curve_bounds(n, seed, step=1.0), **kwargs)
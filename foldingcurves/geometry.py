@@ -0,0 +1,264 @@
+"""
+Vectorised geometry of square-grid words over {A,B,+,-} and mid-grid words over {R,r,L,l,S,s}.
+
+Words are turned into uint8 arrays, headings are a modular cumulative sum of the turns and
+vertices a cumulative sum over a table of direction vectors. Headings count quarter turns:
+  - square grid: heading k points along SQUAREGRID_DIRECTIONS[k] (0 = +x, '-' turns +1, '+' turns -1),
+    exactly as in end_squaregrid_word;
+  - mid grid: heading k points along the diagonal at 45° + 90°k and a half step is
+    MIDGRID_DIRECTIONS[k] in units of half a grid step (so C(R) from heading 0 ends at (2, 0)).
+The walkers keep heading and position between calls, so a word can be fed chunk by chunk,
+e.g. straight from FoldingSequence.iter_word(n, chunk_size=...).
+"""
+import math
+import numpy as np
+from .word import Word
+
+SQUAREGRID_DIRECTIONS = np.array([[1, 0], [0, 1], [-1, 0], [0, -1]], dtype=np.int32)
+MIDGRID_DIRECTIONS = np.array([[1, 1], [-1, 1], [-1, -1], [1, -1]], dtype=np.int32)
+
+# Lookup tables indexed by the byte value of a symbol
+SQUAREGRID_STEP = np.zeros(256, dtype=bool)
+SQUAREGRID_STEP[[ord("A"), ord("B")]] = True
+SQUAREGRID_TURN = np.zeros(256, dtype=np.int8)
+SQUAREGRID_TURN[ord("+")] = -1
+SQUAREGRID_TURN[ord("-")] = 1
+
+MIDGRID_SYMBOL = np.zeros(256, dtype=bool)
+MIDGRID_SYMBOL[[ord(c) for c in "RrLlSs"]] = True
+MIDGRID_TURN = np.zeros(256, dtype=np.int8)
+MIDGRID_TURN[[ord("R"), ord("r")]] = -1
+MIDGRID_TURN[[ord("L"), ord("l")]] = 1
+
+
+def encode(word) -> np.ndarray:
+    """Return the symbols of `word` (str, bytes, uint8 array or Word) as a uint8 array."""
+    if isinstance(word, Word):
+        return word.codes
+    if isinstance(word, np.ndarray):
+        return word.astype(np.uint8, copy=False)
+    if isinstance(word, str):
+        word = word.encode("ascii")
+    return np.frombuffer(word, dtype=np.uint8)
+
+
+# Offset making grid coordinates non-negative when packed into edge keys
+_KEY_OFFSET = 1 << 30
+
+
+def edge_keys(vertices: np.ndarray) -> np.ndarray:
+    """
+    One int64 key per unit edge between consecutive vertices of a square-grid path: the edge's lower/left
+    endpoint packed with its axis (0 horizontal, 1 vertical), so an edge has the same key in either
+    direction. Coordinates must lie within ±2^30.
+    """
+    v = vertices.astype(np.int64) + _KEY_OFFSET
+    a, b = v[:-1], v[1:]
+    lo = np.minimum(a, b)
+    axis = (a[:, 1] != b[:, 1]).astype(np.int64)
+    return (((lo[:, 0] << 31) | lo[:, 1]) << 1) | axis
+
+
+def _headings(turns: np.ndarray, heading: int) -> np.ndarray:
+    # int8 wraps around modulo 256, a multiple of 4, so the running sum stays correct mod 4
+    h = np.cumsum(turns, dtype=np.int8)
+    h += np.int8(heading % 4)
+    h &= 3
+    return h
+
+
+class SquaregridWalker:
+    """Trace a square-grid word fed in chunks, keeping the heading and position between chunks."""
+    def __init__(self, heading: int = 0, start=(0, 0), dtype=np.int32):
+        self.heading = heading % 4
+        self.position = np.array(start, dtype=dtype)
+        self.dtype = dtype
+
+    def headings(self, chunk) -> np.ndarray:
+        """Heading of every step symbol ('A'/'B') in `chunk`; advances the walker's heading."""
+        codes = encode(chunk)
+        h = _headings(SQUAREGRID_TURN[codes], self.heading)
+        if len(h):
+            self.heading = int(h[-1])
+        return h[SQUAREGRID_STEP[codes]]
+
+    def feed(self, chunk) -> np.ndarray:
+        """Return the (k, 2) vertices reached by the k steps in `chunk`; advances the walker."""
+        steps = SQUAREGRID_DIRECTIONS[self.headings(chunk)].astype(self.dtype, copy=False)
+        vertices = np.cumsum(steps, axis=0, dtype=self.dtype)
+        vertices += self.position
+        if len(vertices):
+            self.position = vertices[-1].copy()
+        return vertices
+
+
+class MidgridWalker:
+    """
+    Trace a mid-grid word fed in chunks. Every symbol is two half steps (R/r, L/l turn between
+    them), so a chunk of m symbols gives the 2m vertices at half-step resolution.
+    """
+    def __init__(self, heading: int = 0, start=(0, 0), dtype=np.int32):
+        self.heading = heading % 4
+        self.position = np.array(start, dtype=dtype)
+        self.dtype = dtype
+
+    def half_step_headings(self, chunk) -> np.ndarray:
+        """Headings of the 2m half steps of the m symbols in `chunk`; advances the walker's heading."""
+        codes = encode(chunk)
+        codes = codes[MIDGRID_SYMBOL[codes]]
+        turns = MIDGRID_TURN[codes]
+        after = _headings(turns, self.heading)
+        if len(after):
+            self.heading = int(after[-1])
+        h = np.empty(2 * len(codes), dtype=np.int8)
+        h[0::2] = (after - turns) & 3
+        h[1::2] = after
+        return h
+
+    def feed(self, chunk) -> np.ndarray:
+        """Return the (2m, 2) half-step vertices of the m symbols in `chunk`; advances the walker."""
+        steps = MIDGRID_DIRECTIONS[self.half_step_headings(chunk)].astype(self.dtype, copy=False)
+        vertices = np.cumsum(steps, axis=0, dtype=self.dtype)
+        vertices += self.position
+        if len(vertices):
+            self.position = vertices[-1].copy()
+        return vertices
+
+
+def _vertices(walker, word) -> np.ndarray:
+    start = walker.position.copy()
+    if isinstance(word, (str, bytes, np.ndarray, Word)):
+        word = [word]
+    return np.vstack([start[None, :]] + [walker.feed(chunk) for chunk in word])
+
+
+def squaregrid_vertices(word, heading: int = 0, start=(0, 0), dtype=np.int32) -> np.ndarray:
+    """
+    All vertices of the square-grid curve of `word` (a string or an iterable of string chunks),
+    including the start, as an (k+1, 2) integer array.
+    """
+    return _vertices(SquaregridWalker(heading, start, dtype), word)
+
+
+def midgrid_vertices(word, heading: int = 0, start=(0, 0), dtype=np.int32) -> np.ndarray:
+    """
+    All half-step vertices of the mid-grid curve of `word` (a string or an iterable of string chunks),
+    including the start, as a (2m+1, 2) integer array in units of half a grid step.
+    """
+    return _vertices(MidgridWalker(heading, start, dtype), word)
+
+
+def squaregrid_end(word, heading: int = 0) -> tuple[int, int]:
+    """Exact integer endpoint of the square-grid curve of `word`, from the step count per heading."""
+    walker = SquaregridWalker(heading)
+    if isinstance(word, (str, bytes, np.ndarray, Word)):
+        word = [word]
+    counts = np.zeros(4, dtype=object)
+    for chunk in word:
+        counts += np.bincount(walker.headings(chunk), minlength=4).astype(object)
+    return int(counts[0] - counts[2]), int(counts[1] - counts[3])
+
+
+def midgrid_end(word, heading: int = 0) -> tuple[int, int]:
+    """Exact endpoint of the mid-grid curve of `word` in units of half a grid step."""
+    walker = MidgridWalker(heading)
+    if isinstance(word, (str, bytes, np.ndarray, Word)):
+        word = [word]
+    counts = np.zeros(4, dtype=object)
+    for chunk in word:
+        counts += np.bincount(walker.half_step_headings(chunk), minlength=4).astype(object)
+    x = counts[0] - counts[1] - counts[2] + counts[3]
+    y = counts[0] + counts[1] - counts[2] - counts[3]
+    return int(x), int(y)
+
+
+def turtle_vertices(word, left_angle: float = 90.0, right_angle: float = 90.0,
+                    initial_angle: float = 0.0, step: float = 1.0) -> np.ndarray:
+    """
+    Vertices of a turtle curve with arbitrary turning angles (in degrees): 'A'/'B' step forward,
+    '-' turns left by `left_angle` and '+' turns right by `right_angle`. Returns a (k+1, 2) float array.
+    """
+    codes = encode(word)
+    directions = turtle_directions(codes, left_angle, right_angle, initial_angle)
+    vertices = np.zeros((len(directions) + 1, 2))
+    np.cumsum(step * directions, axis=0, out=vertices[1:])
+    return vertices
+
+
+def turtle_directions(word, left_angle: float = 90.0, right_angle: float = 90.0,
+                      initial_angle: float = 0.0) -> np.ndarray:
+    """
+    Unit vector of every step of a turtle curve (see turtle_vertices), as a (k, 2) array. When all angles
+    are whole degrees the headings are an exact integer cumulative sum in units of their gcd with 360,
+    looked up in a table of unit vectors; otherwise they are summed as floats.
+    """
+    codes = encode(word)
+    angles = (left_angle, right_angle, initial_angle)
+    if all(float(a).is_integer() for a in angles):
+        unit = math.gcd(math.gcd(int(left_angle), int(right_angle)), math.gcd(int(initial_angle), 360))
+        turns = np.zeros(256, dtype=np.int64)
+        turns[ord("-")] = int(left_angle) // unit
+        turns[ord("+")] = -(int(right_angle) // unit)
+        headings = np.cumsum(turns[codes])[SQUAREGRID_STEP[codes]]
+        headings += int(initial_angle) // unit
+        headings %= 360 // unit
+        table = np.radians(unit * np.arange(360 // unit))
+        return np.column_stack([np.cos(table), np.sin(table)])[headings]
+    turns = np.zeros(256)
+    turns[ord("-")] = left_angle
+    turns[ord("+")] = -right_angle
+    radians = np.radians(initial_angle + np.cumsum(turns[codes])[SQUAREGRID_STEP[codes]])
+    return np.column_stack([np.cos(radians), np.sin(radians)])
+
+
+def turtle_end(word, left_angle: float = 90.0, right_angle: float = 90.0) -> tuple[float, float]:
+    """Endpoint of the turtle curve of `word` with arbitrary turning angles (see turtle_vertices)."""
+    x, y = turtle_vertices(word, left_angle, right_angle)[-1]
+    return float(x), float(y)
+
+
+def simplify_polyline(vertices: np.ndarray, tolerance: float) -> np.ndarray:
+    """
+    Drop vertices of a (k, 2) polyline so that it moves by at most `tolerance`, keeping both ends.
+    Vertices are first thinned on a grid (a vertex in the same cell of side tolerance/(2√2) as its
+    predecessor is dropped, moving the line by at most tolerance/2), then reduced by Douglas–Peucker
+    with tolerance/2: a vertex is kept while it is farther than that from the chord of its range.
+    All open ranges are split in the same round, so there is one vectorised pass per level of the
+    Douglas–Peucker recursion.
+    """
+    if tolerance <= 0 or len(vertices) < 3:
+        return vertices
+    # 1. grid thinning: keep the first vertex of every run within one cell
+    cells = np.floor(vertices / (tolerance / (2 * np.sqrt(2.0)))).astype(np.int64)
+    keep = np.ones(len(vertices), dtype=bool)
+    keep[1:-1] = (cells[1:-1] != cells[:-2]).any(axis=1)
+    points = vertices[keep]
+
+    # 2. Douglas–Peucker over the live (undecided) vertices, in rounds
+    keep = np.zeros(len(points), dtype=bool)
+    keep[[0, -1]] = True
+    live = np.arange(1, len(points) - 1)
+    x, y = points[:, 0].copy(), points[:, 1].copy()
+    while len(live):
+        kept = np.flatnonzero(keep)
+        r = np.searchsorted(kept, live) - 1  # range of every live vertex: kept[r] .. kept[r + 1]
+        a, b = kept[r], kept[r + 1]
+        cx, cy = x[b] - x[a], y[b] - y[a]
+        ox, oy = x[live] - x[a], y[live] - y[a]
+        length = np.hypot(cx, cy)
+        # distance to the chord, or to its end point for a closed range
+        closed = length == 0
+        length[closed] = 1.0
+        distance = np.abs(cx * oy - cy * ox) / length
+        distance[closed] = np.hypot(ox[closed], oy[closed])
+        # farthest vertex of every range
+        starts = np.concatenate(([True], r[1:] != r[:-1]))
+        first = np.flatnonzero(starts)
+        group = np.cumsum(starts) - 1
+        farthest = np.maximum.reduceat(distance, first)
+        at_max = np.flatnonzero(distance == farthest[group])
+        at_max = at_max[np.concatenate(([True], group[at_max][1:] != group[at_max][:-1]))]
+        split = farthest > 0.5 * tolerance
+        keep[live[at_max[split]]] = True
+        live = live[split[group] & ~keep[live]]
+    return points[keep]
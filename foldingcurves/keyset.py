@@ -0,0 +1,57 @@
+"""
+A growing set of int64 keys held as a few sorted NumPy runs (a small log-structured merge), so keys
+can be added and looked up chunk by chunk in O(log) amortised time per key without a Python-level
+hash set.
+"""
+import numpy as np
+
+
+def merge_disjoint(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Merge two sorted arrays without common keys into one sorted array, in linear time."""
+    out = np.empty(len(a) + len(b), dtype=np.result_type(a, b))
+    at = np.searchsorted(a, b) + np.arange(len(b))  # where b's keys go among a's
+    out[at] = b
+    rest = np.ones(len(out), dtype=bool)
+    rest[at] = False
+    out[rest] = a
+    return out
+
+
+class KeySet:
+    def __init__(self):
+        self.runs = []  # sorted, duplicate-free, mutually disjoint arrays; sizes decrease along the list
+
+    def __len__(self) -> int:
+        return sum(len(run) for run in self.runs)
+
+    def contains(self, keys: np.ndarray) -> np.ndarray:
+        """Boolean mask of the keys already in the set."""
+        found = np.zeros(len(keys), dtype=bool)
+        for run in self.runs:
+            i = np.searchsorted(run, keys)
+            i[i == len(run)] = 0
+            found |= run[i] == keys
+        return found
+
+    def add(self, keys: np.ndarray) -> int:
+        """Add keys to the set; returns how many of them were new (duplicates within `keys` count once)."""
+        new = np.sort(keys)
+        if len(new):
+            new = new[np.concatenate([[True], new[1:] != new[:-1]])]
+        new = new[~self.contains(new)]
+        if len(new):
+            self.runs.append(new)
+            # merge runs of similar size so there are only O(log n) of them
+            while len(self.runs) > 1 and len(self.runs[-2]) <= 2 * len(self.runs[-1]):
+                b, a = self.runs.pop(), self.runs.pop()
+                self.runs.append(merge_disjoint(a, b))
+        return len(new)
+
+    def keys(self) -> np.ndarray:
+        """All keys, sorted."""
+        if not self.runs:
+            return np.zeros(0, dtype=np.int64)
+        merged = self.runs[-1]
+        for run in reversed(self.runs[:-1]):
+            merged = merge_disjoint(run, merged)
+        return merged
@@ -0,0 +1,162 @@
+"""
+Closed forms for iterates of a substitution, from its matrices instead of the words.
+
+Letter counts of P^n(w) are M^n times the letter counts of w, where M[b, a] counts the letter b in P(a).
+Endpoints are linear too, as long as the heading is tracked: every letter a has a displacement d(a),
+a Gaussian integer measured from heading 0, and a net turn t(a) in quarter turns. The displacement of
+P^n(a) is D_n(a) = sum over the letters b of P(a) of i^(turn before b) * D_{n-1}(b), where the turns are
+those of level n-1. The turns T_n = T_{n-1} M live in (Z/4)^k, so they are eventually periodic and
+D_n is a product of a few fixed Gaussian-integer matrices, raised to a power by repeated squaring.
+
+All arithmetic is on exact Python integers (object arrays); a Gaussian-integer matrix is a pair
+(real part, imaginary part) of integer matrices.
+"""
+import numpy as np
+
+# (dx, dy, turn) of each letter from heading 0, in the conventions of geometry.py:
+# square-grid unit steps, and mid-grid displacements in units of half a grid step
+SQUAREGRID_LETTERS = {"A": (1, 0, 0), "B": (1, 0, 0), "+": (0, 0, -1), "-": (0, 0, 1)}
+MIDGRID_LETTERS = {"R": (2, 0, -1), "r": (2, 0, -1), "L": (0, 2, 1), "l": (0, 2, 1),
+                   "S": (2, 2, 0), "s": (2, 2, 0)}
+
+# Powers of i as (real, imaginary)
+I_POWERS = ((1, 0), (0, 1), (-1, 0), (0, -1))
+
+
+def matrix_power(M: np.ndarray, n: int) -> np.ndarray:
+    """M^n with exact integer entries, by repeated squaring."""
+    M = np.asarray(M).astype(object)
+    result = np.identity(len(M), dtype=int).astype(object)
+    while n:
+        if n & 1:
+            result = result.dot(M)
+        M = M.dot(M)
+        n >>= 1
+    return result
+
+
+def gaussian_matmul(A: tuple, B: tuple) -> tuple:
+    """Product of two Gaussian-integer matrices given as (real, imaginary) pairs."""
+    (a, b), (c, d) = A, B
+    return a.dot(c) - b.dot(d), a.dot(d) + b.dot(c)
+
+
+def gaussian_matrix_power(A: tuple, n: int) -> tuple:
+    """A^n for a Gaussian-integer matrix A = (real, imaginary), by repeated squaring."""
+    size = len(A[0])
+    result = (np.identity(size, dtype=int).astype(object), np.zeros((size, size), dtype=int).astype(object))
+    while n:
+        if n & 1:
+            result = gaussian_matmul(result, A)
+        A = gaussian_matmul(A, A)
+        n >>= 1
+    return result
+
+
+class SubstitutionMatrices:
+    def __init__(self, rules: dict, letters: dict):
+        """
+        Parameters:
+        rules (dict): the substitution, letter -> image; letters without a rule are fixed.
+        letters (dict): letter -> (dx, dy, turn), e.g. SQUAREGRID_LETTERS or MIDGRID_LETTERS.
+        """
+        self.alphabet = sorted(letters)
+        self.index = {c: k for k, c in enumerate(self.alphabet)}
+        self.images = [rules.get(c, c) for c in self.alphabet]
+        k = len(self.alphabet)
+        self.matrix = np.zeros((k, k), dtype=int).astype(object)
+        for a, image in enumerate(self.images):
+            for c in image:
+                self.matrix[self.index[c], a] += 1
+        self.displacement = (np.array([letters[c][0] for c in self.alphabet], dtype=int).astype(object),
+                             np.array([letters[c][1] for c in self.alphabet], dtype=int).astype(object))
+        self.turn = tuple(letters[c][2] % 4 for c in self.alphabet)
+
+    def counts(self, seed: str, n: int) -> np.ndarray:
+        """Exact letter counts of P^n(seed), in the order of `alphabet`."""
+        w = np.zeros(len(self.alphabet), dtype=int).astype(object)
+        for c in seed:
+            w[self.index[c]] += 1
+        return matrix_power(self.matrix, n).dot(w)
+
+    def letter_counts(self, seed: str, n: int) -> dict:
+        """Exact letter counts of P^n(seed) as {letter: count}."""
+        return {c: int(x) for c, x in zip(self.alphabet, self.counts(seed, n))}
+
+    def length(self, seed: str, n: int) -> int:
+        """Exact length of P^n(seed)."""
+        return int(sum(self.counts(seed, n)))
+
+    def _next_turns(self, T: tuple) -> tuple:
+        # net turn of P(a) at the next level, mod 4
+        return tuple(sum(T[self.index[c]] for c in image) % 4 for image in self.images)
+
+    def _step(self, T: tuple) -> tuple:
+        """The Gaussian-integer matrix C with D_n = C D_{n-1}, given the turns T of level n-1."""
+        k = len(self.alphabet)
+        re = np.zeros((k, k), dtype=int).astype(object)
+        im = np.zeros((k, k), dtype=int).astype(object)
+        for a, image in enumerate(self.images):
+            heading = 0
+            for c in image:
+                b = self.index[c]
+                re[a, b] += I_POWERS[heading][0]
+                im[a, b] += I_POWERS[heading][1]
+                heading = (heading + T[b]) % 4
+        return re, im
+
+    def turn_cycle(self, n: int = None) -> tuple:
+        """
+        The net turns T_0, T_1, ... of the levels (up to level n, if given) until they repeat, with the
+        level at which the cycle starts and its period; levels past the list continue the cycle.
+        """
+        turns, seen = [self.turn], {self.turn: 0}
+        while n is None or len(turns) <= n:
+            T = self._next_turns(turns[-1])
+            if T in seen:
+                break
+            seen[T] = len(turns)
+            turns.append(T)
+        start = seen.get(self._next_turns(turns[-1]), len(turns))
+        return turns, start, len(turns) - start
+
+    def level(self, n: int) -> tuple:
+        """
+        Displacements (real, imaginary) and net turns of P^n(c) for every letter c. The turns run
+        through a preperiod and then a cycle, so the matrices of one cycle are multiplied once and
+        the cycle's product is raised to the number of full cycles.
+        """
+        # 1. turns of every level until they repeat
+        turns, start, period = self.turn_cycle(n)
+
+        def product(levels) -> tuple:
+            k = len(self.alphabet)
+            C = (np.identity(k, dtype=int).astype(object), np.zeros((k, k), dtype=int).astype(object))
+            for m in levels:
+                C = gaussian_matmul(self._step(turns[m]), C)
+            return C
+
+        # 2. preperiod, full cycles, then the rest of a cycle
+        if n <= start:
+            C = product(range(n))
+        else:
+            cycles, rest = divmod(n - start, period)
+            C = product(range(start))
+            C = gaussian_matmul(gaussian_matrix_power(product(range(start, start + period)), cycles), C)
+            C = gaussian_matmul(product(range(start, start + rest)), C)
+        T = turns[n] if n < len(turns) else turns[start + (n - start) % period]
+        re, im = C[0].dot(self.displacement[0]) - C[1].dot(self.displacement[1]), \
+            C[0].dot(self.displacement[1]) + C[1].dot(self.displacement[0])
+        return (re, im), T
+
+    def end(self, seed: str, n: int, heading: int = 0) -> tuple[int, int]:
+        """Exact endpoint of the curve of P^n(seed), starting at the origin with the given heading."""
+        (re, im), T = self.level(n)
+        x = y = 0
+        for c in seed:
+            a = self.index[c]
+            cos, sin = I_POWERS[heading]
+            x += cos * re[a] - sin * im[a]
+            y += sin * re[a] + cos * im[a]
+            heading = (heading + T[a]) % 4
+        return int(x), int(y)
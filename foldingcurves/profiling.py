@@ -0,0 +1,182 @@
+"""
+Opt-in instrumentation of the curve pipeline.
+
+Library code marks its stages with `Stage` (a context manager) or wraps a streamed word in `stream`.
+While nobody listens these cost one list check; once a callback is registered with `add_listener`, or
+a `Profiler` is entered, every stage emits a record (a dict) with its scope, stage name, call number,
+nesting depth, wall time, output length and symbols per second. If tracemalloc is tracing (a Profiler
+starts it unless memory=False) the record also has the stage's peak allocation above what was allocated
+when it started; nested stages share tracemalloc's single peak counter, so every stage hands its peak
+on to the stage around it.
+
+A streamed stage (a word produced chunk by chunk for a consumer) is timed only inside its next() calls,
+so its record measures producing the word, while the consuming stage's time includes it.
+
+Usage:
+    with Profiler() as profiler:
+        FoldingSequence("+").turtledraw_foldingcurve(14, draw_boundary=True, backend="svg")
+    for row in profiler.summary():
+        print(row)
+    profiler.save("profile.json")
+"""
+import json
+import time
+import tracemalloc
+
+_listeners = []
+_stack = []  # [current bytes at start, highest traced bytes seen so far] of the open stages
+
+
+def add_listener(callback) -> None:
+    """Call `callback(record)` for every stage record from now on."""
+    _listeners.append(callback)
+
+
+def remove_listener(callback) -> None:
+    _listeners.remove(callback)
+
+
+def _emit(record: dict) -> None:
+    if record["length"] is not None and record["seconds"] > 0:
+        record["symbols_per_second"] = record["length"] / record["seconds"]
+    for callback in list(_listeners):
+        callback(record)
+
+
+class Stage:
+    """
+    Time one stage of `scope`. Set `length` inside the block to record the size of its output:
+        with Stage("boundary_rules", "reduce") as stage:
+            w = reduce(w)
+            stage.length = len(w)
+    """
+    __slots__ = ("scope", "name", "length", "active", "seconds", "peak_bytes", "_start")
+
+    def __init__(self, scope: str, name: str, length: int = None):
+        self.scope = scope
+        self.name = name
+        self.length = length
+        self.active = False
+        self.seconds = 0.0
+        self.peak_bytes = None
+
+    def start(self) -> None:
+        if tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            if _stack:
+                _stack[-1][1] = max(_stack[-1][1], peak)
+            tracemalloc.reset_peak()
+            _stack.append([current, current])
+        else:
+            _stack.append(None)
+        self._start = time.perf_counter()
+
+    def stop(self) -> None:
+        self.seconds = time.perf_counter() - self._start
+        frame = _stack.pop()
+        if frame is not None and tracemalloc.is_tracing():
+            highest = max(frame[1], tracemalloc.get_traced_memory()[1])
+            self.peak_bytes = highest - frame[0]
+            if _stack and _stack[-1] is not None:
+                _stack[-1][1] = max(_stack[-1][1], highest)
+
+    def record(self) -> dict:
+        return {"scope": self.scope, "stage": self.name, "depth": len(_stack), "seconds": self.seconds,
+                "length": self.length, "peak_bytes": self.peak_bytes, "symbols_per_second": None}
+
+    def __enter__(self):
+        self.active = bool(_listeners)
+        if self.active:
+            self.start()
+        return self
+
+    def __exit__(self, *exc):
+        if self.active:
+            self.stop()
+            _emit(self.record())
+
+
+def stream(chunks, scope: str, name: str):
+    """
+    Wrap an iterable of word chunks (or symbols) so that producing them is recorded as one stage,
+    emitted when the stream is exhausted or closed. Returns `chunks` itself while nobody listens.
+    """
+    if not _listeners:
+        return chunks
+    return _timed_stream(iter(chunks), scope, name)
+
+
+def _timed_stream(chunks, scope: str, name: str):
+    total = Stage(scope, name, 0)
+    depth = len(_stack)
+    try:
+        while True:
+            step = Stage(scope, name)
+            step.start()
+            try:
+                chunk = next(chunks)
+            except StopIteration:
+                break
+            finally:
+                step.stop()
+                total.seconds += step.seconds
+                if step.peak_bytes is not None:
+                    total.peak_bytes = max(total.peak_bytes or 0, step.peak_bytes)
+            total.length += len(chunk)
+            yield chunk
+    finally:
+        record = total.record()
+        record["depth"] = depth
+        _emit(record)
+
+
+class Profiler:
+    def __init__(self, memory: bool = True):
+        """
+        Parameters:
+        memory (bool): trace allocations with tracemalloc to record each stage's peak (slows Python code down).
+        """
+        self.memory = memory
+        self.records = []
+        self._calls = {}
+        self._started_tracing = False
+
+    def _add(self, record: dict) -> None:
+        key = (record["scope"], record["stage"])
+        self._calls[key] = record["call"] = self._calls.get(key, -1) + 1
+        self.records.append(record)
+
+    def __enter__(self):
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        add_listener(self._add)
+        return self
+
+    def __exit__(self, *exc):
+        remove_listener(self._add)
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def summary(self) -> list:
+        """Totals per (scope, stage) in order of first appearance: calls, seconds, length, peak and symbols/sec."""
+        rows = {}
+        for r in self.records:
+            row = rows.setdefault((r["scope"], r["stage"]), {"scope": r["scope"], "stage": r["stage"], "calls": 0,
+                                                           "seconds": 0.0, "length": None, "peak_bytes": None})
+            row["calls"] += 1
+            row["seconds"] += r["seconds"]
+            if r["length"] is not None:
+                row["length"] = (row["length"] or 0) + r["length"]
+            if r["peak_bytes"] is not None:
+                row["peak_bytes"] = max(row["peak_bytes"] or 0, r["peak_bytes"])
+        for row in rows.values():
+            has_rate = row["length"] is not None and row["seconds"] > 0
+            row["symbols_per_second"] = row["length"] / row["seconds"] if has_rate else None
+        return list(rows.values())
+
+    def save(self, filename: str) -> None:
+        """Write the records and the summary as JSON."""
+        with open(filename, "w") as f:
+            json.dump({"records": self.records, "summary": self.summary()}, f, indent=1)
@@ -0,0 +1,106 @@
+"""
+Density rasters for curves too long to draw as vectors.
+
+Segments are binned into a fixed pixel grid (one channel per curve, e.g. the folding curve and its
+left/right boundaries), recording the length of curve that falls into each pixel. The grid is
+filled chunk by chunk, so memory stays fixed whatever the number of segments. The result is saved
+either as the raw densities (.npy) or as a PNG composited in the given colours.
+"""
+import struct
+import zlib
+import numpy as np
+
+
+def _rgb(colour) -> np.ndarray:
+    """A colour as RGB floats in [0, 1]; accepts '#rgb', '#rrggbb' or any matplotlib colour name."""
+    if isinstance(colour, str) and colour.startswith("#") and len(colour) in (4, 7):
+        h = colour[1:]
+        if len(h) == 3:
+            h = "".join(c * 2 for c in h)
+        return np.array([int(h[k:k + 2], 16) for k in (0, 2, 4)]) / 255.0
+    from matplotlib.colors import to_rgb
+    return np.array(to_rgb(colour))
+
+
+def write_png(filename: str, rgb: np.ndarray) -> None:
+    """Write an (h, w, 3) uint8 array as an 8-bit RGB PNG file (no dependencies beyond zlib)."""
+    h, w, _ = rgb.shape
+    raw = np.hstack([np.zeros((h, 1), dtype=np.uint8), rgb.reshape(h, 3 * w)]).tobytes()
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    with open(filename, "wb") as f:
+        f.write(b"\x89PNG\r\n\x1a\n")
+        f.write(chunk(b"IHDR", struct.pack(">IIBBBBB", w, h, 8, 2, 0, 0, 0)))
+        f.write(chunk(b"IDAT", zlib.compress(raw, 6)))
+        f.write(chunk(b"IEND", b""))
+
+
+class DensityRaster:
+    def __init__(self, bounds, size: int = 1024, channels: int = 1):
+        """
+        Parameters:
+        bounds (tuple): (xmin, ymin, xmax, ymax) of the region to rasterise.
+        size (int): number of pixels along the longer side; pixels are square.
+        channels (int): number of separate density channels.
+        """
+        xmin, ymin, xmax, ymax = bounds
+        self.pixel = max(xmax - xmin, ymax - ymin) / size or 1.0
+        self.origin = np.array([xmin, ymin], dtype=float)
+        self.width = max(1, int(np.ceil((xmax - xmin) / self.pixel)))
+        self.height = max(1, int(np.ceil((ymax - ymin) / self.pixel)))
+        self.density = np.zeros((channels, self.height * self.width))
+
+    def add_points(self, channel: int, points: np.ndarray, weights: np.ndarray = None) -> None:
+        """Add (weighted) points to a channel; points outside the raster are dropped."""
+        ij = np.floor((points - self.origin) / self.pixel).astype(np.int64)
+        ij[:, 0][ij[:, 0] == self.width] -= 1  # points on the right/top edge of the bounds
+        ij[:, 1][ij[:, 1] == self.height] -= 1
+        col, row = ij[:, 0], self.height - 1 - ij[:, 1]  # image rows run downwards
+        inside = (col >= 0) & (col < self.width) & (row >= 0) & (row < self.height)
+        idx = row[inside] * self.width + col[inside]
+        w = None if weights is None else weights[inside]
+        self.density[channel] += np.bincount(idx, weights=w, minlength=self.density.shape[1])
+
+    def add_polyline(self, channel: int, vertices: np.ndarray) -> None:
+        """
+        Add the segments between consecutive vertices to a channel. Every segment is sampled at
+        about two points per pixel and each sample carries its share of the segment's length.
+        """
+        if len(vertices) < 2:
+            return
+        a, b = vertices[:-1], vertices[1:]
+        lengths = np.hypot(*(b - a).T)
+        k = np.maximum(1, np.ceil(2 * lengths / self.pixel)).astype(np.int64)
+        seg = np.repeat(np.arange(len(a)), k)
+        t = (np.arange(len(seg)) - np.repeat(np.cumsum(k) - k, k) + 0.5) / k[seg]
+        self.add_points(channel, a[seg] + t[:, None] * (b - a)[seg], (lengths / k)[seg])
+
+    def image(self, colours, background: str = "#ffffff") -> np.ndarray:
+        """
+        Composite the channels, in order, over the background. A channel's opacity in a pixel is
+        1 - exp(-density / pixel size), i.e. it saturates once the pixel holds a pixel-length of curve.
+        """
+        out = np.broadcast_to(_rgb(background), (self.height * self.width, 3)).copy()
+        for d, colour in zip(self.density, colours):
+            alpha = (1.0 - np.exp(-d / self.pixel))[:, None]
+            out = (1.0 - alpha) * out + alpha * _rgb(colour)
+        return np.round(255 * out).astype(np.uint8).reshape(self.height, self.width, 3)
+
+    def save(self, filename: str, colours=None, background: str = "#ffffff") -> None:
+        """Save as .npy (raw densities, shape (channels, height, width)) or as a PNG image."""
+        if filename.endswith(".npy"):
+            np.save(filename, self.density.reshape(-1, self.height, self.width).astype(np.float32))
+        else:
+            write_png(filename, self.image(colours, background))
+
+
+def polyline_bounds(chunks) -> tuple:
+    """Bounding box (xmin, ymin, xmax, ymax) of a stream of vertex arrays."""
+    lo, hi = np.full(2, np.inf), np.full(2, -np.inf)
+    for vertices in chunks:
+        if len(vertices):
+            lo = np.minimum(lo, vertices.min(axis=0))
+            hi = np.maximum(hi, vertices.max(axis=0))
+    return lo[0], lo[1], hi[0], hi[1]
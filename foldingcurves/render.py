@@ -0,0 +1,132 @@
+"""
+Batch rendering of folding curves in a process pool.
+
+A batch is a list of RenderJobs (sequence, level, kind, filename and drawing options). Every worker keeps
+its own renderer state: its FoldingSequence objects, one LevelCache holding their expanded words and, for
+backend="turtle", its own turtle screen. The jobs of one sequence go to one worker as a single task, in
+ascending level, so the words of level n-1 are in that worker's cache when level n is built. With a
+`spill_dir` the workers also share the large expanded words through memory-mapped files. Sequences are
+started most expensive first (by the total length of their words P^i(A)), which keeps the workers evenly
+loaded. Each job is timed, and a failing job is reported in the results instead of stopping the batch.
+
+Usage:
+    jobs = [RenderJob("+", i, f"output/example1/{i}scaled.svg", step=30, curve_width=1, rounded_corners=0)
+            for i in [0, 1, 2, 3, 5, 7, 10]]
+    for result in render_batch(jobs):
+        print(result["filename"], result["seconds"])
+"""
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from .cache import LevelCache
+from .squaregrid import FoldingSequence, draw_sqauregrid_word, draw_midgrid_word
+from . import svg
+
+KINDS = ("foldingcurve", "raster", "word")
+
+
+class RenderJob:
+    def __init__(self, sequence: str, level: int, filename: str, kind: str = "foldingcurve", **options):
+        """
+        Parameters:
+        sequence (str): the folding sequence.
+        level (int): the level i to draw.
+        filename (str): output file.
+        kind (str): "foldingcurve" for FoldingSequence.turtledraw_foldingcurve (scaled curve and boundaries;
+                    backend="svg" unless given), "raster" for rasterdraw_foldingcurve, or "word" for the
+                    unscaled curve of the word P^i(seed) as draw_sqauregrid_word / draw_midgrid_word draw it
+                    (seed="A" unless given, written headlessly to SVG).
+        options: keyword arguments of the drawing function.
+        """
+        if kind not in KINDS:
+            raise ValueError(f"unknown kind {kind!r}, expected one of {KINDS}")
+        self.sequence = sequence
+        self.level = level
+        self.filename = filename
+        self.kind = kind
+        self.options = options
+
+    def __repr__(self) -> str:
+        return f"RenderJob({self.sequence!r}, {self.level}, {self.filename!r}, kind={self.kind!r})"
+
+
+# Per-worker renderer state, set up by _init_worker in every process of the pool
+_worker_cache = None
+_worker_sequences = {}
+
+
+def _init_worker(cache_bytes: int, spill_dir: str) -> None:
+    global _worker_cache, _worker_sequences
+    _worker_cache = LevelCache(cache_bytes, spill_dir)
+    _worker_sequences = {}
+
+
+def _sequence(sequence: str) -> FoldingSequence:
+    if _worker_cache is None:  # rendering in the calling process
+        _init_worker(1 << 30, None)
+    s = _worker_sequences.get(sequence)
+    if s is None:
+        s = _worker_sequences[sequence] = FoldingSequence(sequence, cache=_worker_cache)
+    return s
+
+
+def render(job: RenderJob) -> None:
+    """Render one job in this process (reusing the words of earlier jobs of the same sequence)."""
+    s = _sequence(job.sequence)
+    if os.path.dirname(job.filename):
+        os.makedirs(os.path.dirname(job.filename), exist_ok=True)
+    if job.kind == "foldingcurve":
+        s.turtledraw_foldingcurve(job.level, filename=job.filename, **{"backend": "svg", **job.options})
+    elif job.kind == "raster":
+        s.rasterdraw_foldingcurve(job.level, filename=job.filename, **job.options)
+    else:
+        options = dict(job.options)
+        seed = options.pop("seed", "A")
+        options.setdefault("step", 12.0)
+        with svg.SVGWriter(job.filename) as writer:
+            if seed in ("A", "B"):
+                draw_sqauregrid_word(s.word(job.level, seed), writer=writer, **options)
+            else:
+                options.setdefault("initial_angle", 45.0)
+                draw_midgrid_word(s.word(job.level, seed), writer=writer, **options)
+
+
+def _timed_render(job: RenderJob) -> dict:
+    start = time.perf_counter()
+    error = None
+    try:
+        render(job)
+    except Exception as e:  # reported per job, the rest of the batch still runs
+        error = f"{type(e).__name__}: {e}"
+    return {"filename": job.filename, "sequence": job.sequence, "level": job.level, "kind": job.kind,
+            "seconds": time.perf_counter() - start, "pid": os.getpid(), "error": error}
+
+
+def _render_sequence(jobs: list) -> list:
+    # the jobs of one sequence, in ascending level, in one worker
+    return [_timed_render(job) for job in jobs]
+
+
+def render_batch(jobs: list, processes: int = None, cache_bytes: int = 1 << 30, spill_dir: str = None) -> list:
+    """
+    Render a list of RenderJobs in a pool of `processes` workers (default: all CPUs). Returns one dict
+    per job, in job order, with its filename, sequence, level, kind, wall time in seconds, worker pid
+    and error message (None if it succeeded).
+    """
+    workers = processes or os.cpu_count() or 1
+    # one task per sequence with its jobs in ascending level; the most expensive sequences first
+    groups = {}
+    for k, job in enumerate(jobs):
+        groups.setdefault(job.sequence, []).append(k)
+    cost = {sequence: sum(FoldingSequence(sequence).word_length(jobs[k].level) for k in group)
+            for sequence, group in groups.items()}
+    tasks = [sorted(group, key=lambda k: jobs[k].level) for group in groups.values()]
+    tasks.sort(key=lambda group: -cost[jobs[group[0]].sequence])
+
+    results = [None] * len(jobs)
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(cache_bytes, spill_dir)) as pool:
+        futures = {pool.submit(_render_sequence, [jobs[k] for k in group]): group for group in tasks}
+        for future in as_completed(futures):
+            for k, result in zip(futures[future], future.result()):
+                results[k] = result
+    return results
@@ -0,0 +1,207 @@
+"""
+Batch search over folding sequences.
+
+Enumerates every folding sequence (word over {+,-}) in a range of lengths, keeps one representative
+per symmetry class (switch, reverse, invert), analyses the representatives (boundary dimension,
+self-avoidance, plane-filling) in a process pool and
+stores the results in an SQLite database. Sequences already in the database are skipped, so an
+interrupted run resumes where it stopped.
+
+Usage:
+    python -m foldingcurves.search --max-length 12 --db sequences.sqlite
+"""
+import argparse
+import collections
+import itertools
+import json
+import os
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from .squaregrid import FoldingSequence, end_squaregrid_word
+from .dimension import boundary_dimension
+
+VERTEX_SET = ('R', 'L', 'S', 's')
+
+COLUMNS = (
+    ("sequence", "TEXT"),
+    ("vertex_set", "TEXT"),
+    ("length", "INTEGER"),
+    ("adjacency", "TEXT"),          # JSON list of rows
+    ("spectral_radius", "REAL"),
+    ("end_x", "INTEGER"),           # end(P(A))
+    ("end_y", "INTEGER"),
+    ("scaling_factor", "REAL"),     # |end(P(A))|
+    ("dimension", "REAL"),          # log(rho) / log(scaling factor), the similarity dimension
+    ("contracting", "INTEGER"),     # scaling factor > 1
+    ("check_level", "INTEGER"),     # level n at which the curve P^n(A) was checked
+    ("self_avoiding", "INTEGER"),
+    ("plane_filling", "INTEGER"),
+    ("box_dimension", "REAL"),      # box-counting estimate of the boundary dimension (optional)
+    ("box_dimension_low", "REAL"),  # its 95% confidence interval
+    ("box_dimension_high", "REAL"),
+)
+
+MAX_CHECK_STEPS = 1 << 16  # longest curve P^n(A) walked by the self-avoidance check
+
+
+def enumerate_sequences(max_length: int, min_length: int = 1):
+    """Yield every word over {+,-} with length between `min_length` and `max_length`."""
+    for m in range(min_length, max_length + 1):
+        for letters in itertools.product("+-", repeat=m):
+            yield "".join(letters)
+
+
+def canonical(sequence: str) -> str:
+    """The smallest of a folding sequence and its switch, reverse and invert."""
+    s = FoldingSequence(sequence)
+    return min(sequence, s.inv_switch(sequence), s.inv_reverse(sequence), s.inv_invert(sequence))
+
+
+def unique_sequences(max_length: int, min_length: int = 1):
+    """Yield one representative (the canonical one) of each symmetry class of folding sequences."""
+    for sequence in enumerate_sequences(max_length, min_length):
+        if canonical(sequence) == sequence:
+            yield sequence
+
+
+def check_level(sequence: str, max_steps: int = MAX_CHECK_STEPS) -> int:
+    """The deepest level n >= 1 at which P^n(A) has at most `max_steps` segments."""
+    n = 1
+    while (len(sequence) + 1) ** (n + 1) <= max_steps:
+        n += 1
+    return n
+
+
+def estimate_boundary_dimension(s: FoldingSequence, max_steps: int = 4 * MAX_CHECK_STEPS) -> dict:
+    """Box-counting estimate of the dimension of the right boundary, at the deepest level with at most `max_steps` letters."""
+    n = 1
+    while s.word_length(n + 1, "R") <= max_steps:
+        n += 1
+    try:
+        return boundary_dimension(s, n, mass=False)["box"]
+    except ValueError:  # too few scales to fit
+        return None
+
+
+def analyse(sequence: str, vertex_set=VERTEX_SET, max_steps: int = MAX_CHECK_STEPS, estimate: bool = False) -> dict:
+    """
+    Boundary adjacency matrix, spectral radius, scaling factor and similarity dimension of a folding sequence,
+    and whether its curve is self-avoiding and plane-filling (checked at the level given by check_level).
+    If `estimate` is set, the dimension is also estimated by box counting as a consistency check.
+    """
+    s = FoldingSequence(sequence)
+    M = s.boundary_morphism_adjacency_matrix(list(vertex_set))
+    rho = float(max(abs(np.linalg.eigvals(M)))) if M.size else 0.0
+    x, y = end_squaregrid_word(s.rules.P0["A"])
+    c = float(np.hypot(x, y))
+    contracting = c > 1
+    dimension = float(np.log(rho) / np.log(c)) if contracting and rho > 0 else None
+    level = check_level(sequence, max_steps)
+    self_avoiding = s.is_self_avoiding(level)
+    plane_filling = self_avoiding and s.has_dimension_two()  # is_plane_filling without walking the curve again
+    box = estimate_boundary_dimension(s) if estimate and self_avoiding and dimension is not None else None
+    return {"sequence": sequence, "vertex_set": "".join(vertex_set), "length": len(sequence),
+            "adjacency": json.dumps(M.tolist()), "spectral_radius": rho, "end_x": x, "end_y": y,
+            "scaling_factor": c, "dimension": dimension, "contracting": int(contracting),
+            "check_level": level, "self_avoiding": int(self_avoiding), "plane_filling": int(plane_filling),
+            "box_dimension": box and box["dimension"], "box_dimension_low": box and box["low"],
+            "box_dimension_high": box and box["high"]}
+
+
+class ResultStore:
+    """SQLite table of analysed folding sequences, keyed by (sequence, vertex_set)."""
+    def __init__(self, path: str):
+        self.connection = sqlite3.connect(path)
+        columns = ", ".join(f"{name} {kind}" for name, kind in COLUMNS)
+        self.connection.execute(
+            f"CREATE TABLE IF NOT EXISTS results ({columns}, PRIMARY KEY (sequence, vertex_set))")
+        # stores written by an older version lack the newer columns
+        existing = {row[1] for row in self.connection.execute("PRAGMA table_info(results)")}
+        for name, kind in COLUMNS:
+            if name not in existing:
+                self.connection.execute(f"ALTER TABLE results ADD COLUMN {name} {kind}")
+        self.connection.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def done(self, vertex_set=VERTEX_SET, estimate: bool = False) -> set:
+        """Sequences already fully analysed for this vertex set (including the dimension estimate if `estimate`)."""
+        condition = "vertex_set = ? AND check_level IS NOT NULL"
+        if estimate:
+            condition += " AND (box_dimension IS NOT NULL OR dimension IS NULL OR self_avoiding = 0)"
+        rows = self.connection.execute(f"SELECT sequence FROM results WHERE {condition}", ("".join(vertex_set),))
+        return {row[0] for row in rows}
+
+    def add(self, results: list) -> None:
+        names = [name for name, _ in COLUMNS]
+        self.connection.executemany(
+            f"INSERT OR REPLACE INTO results ({', '.join(names)}) VALUES ({', '.join('?' * len(names))})",
+            [tuple(r[name] for name in names) for r in results])
+        self.connection.commit()
+
+    def rows(self, where: str = "1", params: tuple = ()) -> list:
+        """Stored results matching an SQL condition, as dicts."""
+        cursor = self.connection.execute(f"SELECT * FROM results WHERE {where}", params)
+        names = [d[0] for d in cursor.description]
+        return [dict(zip(names, row)) for row in cursor]
+
+    def close(self) -> None:
+        self.connection.close()
+
+
+def _analyse_batch(args) -> list:
+    sequences, vertex_set, estimate = args
+    return [analyse(sequence, vertex_set, estimate=estimate) for sequence in sequences]
+
+
+def run_search(max_length: int, db: str, min_length: int = 1, vertex_set=VERTEX_SET,
+               processes: int = None, batch_size: int = 256, estimate: bool = False) -> int:
+    """
+    Analyse every symmetry class of folding sequences with lengths in [min_length, max_length] that is
+    not yet in the database `db`, in a pool of `processes` worker processes. Results are committed one
+    batch at a time. With `estimate`, the boundary dimension is also estimated by box counting.
+    Returns the number of sequences analysed.
+    """
+    vertex_set = tuple(vertex_set)
+    with ResultStore(db) as store:
+        done = store.done(vertex_set, estimate)
+        todo = (s for s in unique_sequences(max_length, min_length) if s not in done)
+        batches = iter(lambda: list(itertools.islice(todo, batch_size)), [])
+        count = 0
+        workers = processes or os.cpu_count() or 1
+        with ProcessPoolExecutor(workers) as pool:
+            # keep a bounded number of batches in flight, so the enumeration is never held in memory
+            in_flight = collections.deque()
+            for batch in itertools.chain(batches, [None]):
+                if batch is not None:
+                    in_flight.append(pool.submit(_analyse_batch, (batch, vertex_set, estimate)))
+                while in_flight and (batch is None or len(in_flight) > 4 * workers):
+                    results = in_flight.popleft().result()
+                    store.add(results)
+                    count += len(results)
+    return count
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Analyse all folding sequences up to a given length.")
+    parser.add_argument("--max-length", type=int, required=True, help="longest folding sequence")
+    parser.add_argument("--min-length", type=int, default=1, help="shortest folding sequence")
+    parser.add_argument("--db", default="sequences.sqlite", help="SQLite result store (resumed if it exists)")
+    parser.add_argument("--vertex-set", default="".join(VERTEX_SET), help="boundary letters of the adjacency matrix")
+    parser.add_argument("--processes", type=int, default=None, help="worker processes (default: all CPUs)")
+    parser.add_argument("--batch-size", type=int, default=256, help="sequences per task and per commit")
+    parser.add_argument("--estimate-dimension", action="store_true",
+                        help="also estimate the boundary dimension by box counting")
+    args = parser.parse_args(argv)
+    count = run_search(args.max_length, args.db, args.min_length, tuple(args.vertex_set),
+                       args.processes, args.batch_size, args.estimate_dimension)
+    print(f"analysed {count} folding sequences, results in {args.db}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,69 +1,81 @@
 import numpy as np
-from turtle import *
-import canvasvg
 import io
-from contextlib import redirect_stdout, redirect_stderr
+from collections import OrderedDict
+from contextlib import nullcontext, redirect_stdout, redirect_stderr
+from .substitution import Substitution
+from .geometry import squaregrid_end, SquaregridWalker, MidgridWalker, edge_keys
+from .keyset import KeySet
+from .matrices import SubstitutionMatrices, SQUAREGRID_LETTERS, MIDGRID_LETTERS, I_POWERS
+from .word import Word, PackedWord, word_chunks
+from .cache import LevelCache
+from . import svg
+from .profiling import Stage, stream
+from .raster import DensityRaster, polyline_bounds
 
 SQUAREGRID_ALPHABET = ('A', 'B')
 MIDGRID_ALPHABET = ('R', 'r', 'L', 'l', 'S', 's')
 
 # Helpers for drawing
-screen = Screen()
-screen._root.withdraw()  # Hide the Tk window
-canvas = screen.getcanvas()
 ANGLE_90 = 90
 FONTNAME = "Times New Roman"
 FONTTYPE = "normal"
 FONTSIZE = 12
+CHUNK_SIZE = 1 << 20  # symbols per chunk when streaming words to the SVG backend
+
+# The turtle backend needs Tk; it is only imported and set up on first use, so that importing
+# this module (and drawing with the SVG backend) touches no GUI.
+screen = None
+canvas = None
+
+def _turtle():
+    global screen, canvas
+    import turtle
+    if screen is None:
+        screen = turtle.Screen()
+        screen._root.withdraw()  # Hide the Tk window
+        canvas = screen.getcanvas()
+    return turtle
 
 # Helper to quietly save SVG (suppress stdout/stderr)
 def save_canvas_svg(filename: str, reset_after: bool = True):
-    update()
+    import canvasvg
+    t = _turtle()
+    t.update()
     buf_out, buf_err = io.StringIO(), io.StringIO()
     with redirect_stdout(buf_out), redirect_stderr(buf_err):
         canvasvg.saveall(filename, canvas)
     if reset_after:
-        clearscreen()
+        t.clearscreen()
 
 def _turtle_turn_right(radius: float, angle: float = 90.0) -> None:
     """
     Turn right by `angle` degrees. If `radius > 0`, draw a clockwise arc
     of that radius and extent instead of a sharp turn.
     """
+    t = _turtle()
     if radius and radius > 0:
-        circle(-radius, extent=angle)  # clockwise arc
+        t.circle(-radius, extent=angle)  # clockwise arc
     else:
-        right(angle)
+        t.right(angle)
 
 def _turtle_turn_left(radius: float, angle: float = 90.0) -> None:
     """
     Turn left by `angle` degrees. If `radius > 0`, draw a counterclockwise arc
     of that radius and extent instead of a sharp turn.
     """
+    t = _turtle()
     if radius and radius > 0:
-        circle(radius, extent=angle)   # counterclockwise arc
+        t.circle(radius, extent=angle)   # counterclockwise arc
     else:
-        left(angle)
+        t.left(angle)
 
 def end_squaregrid_word(word: str) -> tuple[int, int]:
     """
     Compute the integer endpoint of a square-grid word over {A,B,+,-}.
     '+' = left 90°, '-' = right 90°, 'A'/'B' = step forward.
-    Returns (x, y) as integers.
+    Returns (x, y) as integers. `word` may also be an iterable of string chunks.
     """
-    x, y = 0, 0
-    dir = 0 # direction: 0 = West, 1 = North, 2 = East, 3 = South
-    for cmd in word:
-        if cmd in "AB":
-            if dir == 0:   x += 1
-            elif dir == 1: y += 1
-            elif dir == 2: x -= 1
-            else: y -= 1
-        elif cmd == '+':
-            dir = (dir - 1) % 4
-        elif cmd == '-':
-            dir = (dir + 1) % 4
-    return x, y
+    return squaregrid_end(word)
 
 def draw_sqauregrid_word(word: str, 
                                 step: float,
@@ -72,41 +84,56 @@ def draw_sqauregrid_word(word: str,
                                 pen_colour: str = "black",
                                 pen_width: float = 2.5,
                                 arrow_head: bool = True,
-                                label: bool = False) -> None:
-    """Axis-aligned: 'A'/'B' forward, '+' left 90°, '-' right 90°."""
-    tracer(0)         # no per-move repaint
-    ht()              # hide turtle
-    pencolor(pen_colour)
-    pensize(pen_width)
-    penup(); home(); setheading(initial_angle); pendown()
-
+                                label: bool = False,
+                                writer: svg.SVGWriter = None,
+                                tolerance: float = 0.0) -> None:
+    """
+    Axis-aligned: 'A'/'B' forward, '+' left 90°, '-' right 90°.
+    Draws on the turtle canvas, or headlessly into `writer` (an svg.SVGWriter) if one is given,
+    in which case `word` may also be an iterable of string chunks.
+    Corners rounded by less than `tolerance` are drawn sharp, and the SVG path of a sharp-cornered
+    curve is simplified to within `tolerance` (see geometry.simplify_polyline).
+    """
     radius = rounded_corners * step
-
-    forward(radius)
+    if radius < tolerance:
+        radius = 0.0
+
+    if writer is not None:
+        # simplification only removes corners once grid steps come close to the tolerance
+        svg.draw_word(writer, word, svg.squaregrid_moves(step, radius), initial_angle, radius,
+                      lead=radius, tail=radius, pen_colour=pen_colour, pen_width=pen_width,
+                      arrow_head=arrow_head, label=label, tolerance=tolerance if step < 4*tolerance else 0.0)
+        return
+
+    t = _turtle()
+    t.tracer(0)         # no per-move repaint
+    t.ht()              # hide turtle
+    t.pencolor(pen_colour)
+    t.pensize(pen_width)
+    t.penup(); t.home(); t.setheading(initial_angle); t.pendown()
+
+    # straight moves are merged and only made before a label or a turn
+    pending = radius
     for ch in word:
-        if ch == "A":
-            forward(0.5 * (step - 2*radius))
+        if ch in ("A", "B"):
+            pending += 0.5 * (step - 2*radius)
             if label:
-                write(ch, align = "center", font = (FONTNAME, FONTSIZE, FONTTYPE))
-            forward(0.5 * (step - 2*radius))
-        if ch == "B":
-            forward(0.5 * (step - 2*radius))
-            if label:
-                write(ch, align = "right", font = (FONTNAME, FONTSIZE, FONTTYPE))
-            forward(0.5 * (step - 2*radius))
-        elif ch == "+":
+                t.forward(pending); pending = 0.0
+                t.write(ch, align = "center" if ch == "A" else "right", font = (FONTNAME, FONTSIZE, FONTTYPE))
+            pending += 0.5 * (step - 2*radius)
+        elif ch in ("+", "-"):
+            t.forward(pending); pending = 0.0
             if label: 
-                write(ch, align="left", font = (FONTNAME, FONTSIZE, FONTTYPE))
-            _turtle_turn_right(radius=radius, angle=ANGLE_90)
-        elif ch == "-":
-            if label:
-                write(ch, align="left", font = (FONTNAME, FONTSIZE, FONTTYPE))
-            _turtle_turn_left(radius=radius, angle=ANGLE_90)
+                t.write(ch, align="left", font = (FONTNAME, FONTSIZE, FONTTYPE))
+            if ch == "+":
+                _turtle_turn_right(radius=radius, angle=ANGLE_90)
+            else:
+                _turtle_turn_left(radius=radius, angle=ANGLE_90)
 
-    forward(radius)
+    t.forward(pending + radius)
 
     if arrow_head: 
-        st()
+        t.st()
 
 
 def draw_midgrid_word(word: str, 
@@ -116,55 +143,151 @@ def draw_midgrid_word(word: str,
                              pen_colour: str = "black",
                              pen_width: float = 2.5,
                              arrow_head: bool = False,
-                             label: bool = False) -> None:
+                             label: bool = False,
+                             writer: svg.SVGWriter = None,
+                             tolerance: float = 0.0) -> None:
     """
     Draw curve of word over {R,r,L,l,S,s}
     R / r  = half-step, right turn 90°, half-step;  L / l = half-step, left turn 90°, half-step; S/s = full step.
     Each diagonal segment has length √2 * step.
+    Draws on the turtle canvas, or headlessly into `writer` (an svg.SVGWriter) if one is given,
+    in which case `word` may also be an iterable of string chunks.
+    Corners rounded by less than `tolerance` are drawn sharp, and the SVG path of a sharp-cornered
+    curve is simplified to within `tolerance` (see geometry.simplify_polyline).
     """    
-    tracer(0)         # no per-move repaint
-    ht()              # hide turtle
-    pencolor(pen_colour)
-    pensize(pen_width)
-    penup(); home(); setheading(initial_angle); pendown()
-
     full = step * np.sqrt(2.0)
     half = 0.5 * full
     radius =  rounded_corners * full
+    if radius < tolerance:
+        radius = 0.0
+
+    if writer is not None:
+        svg.draw_word(writer, word, svg.midgrid_moves(step, radius), initial_angle, radius,
+                      pen_colour=pen_colour, pen_width=pen_width, arrow_head=arrow_head, label=label,
+                      tolerance=tolerance if step < 4*tolerance else 0.0)
+        return
+
+    t = _turtle()
+    t.tracer(0)         # no per-move repaint
+    t.ht()              # hide turtle
+    t.pencolor(pen_colour)
+    t.pensize(pen_width)
+    t.penup(); t.home(); t.setheading(initial_angle); t.pendown()
 
     # initial half step
     
-    # interior
+    # interior; straight moves are merged and only made before a label or a turn
+    pending = 0.0
     for ch in word:
-        if ch in ("R", "r"):
-            forward(half-radius)
-            if label:
-                write(ch, font = (FONTNAME, FONTSIZE, FONTTYPE))
-            _turtle_turn_right(radius=radius, angle=ANGLE_90)
-            forward(half-radius)
-        elif ch in ("L", "l"):
-            forward(half-radius)
+        if ch in ("R", "r", "L", "l"):
+            t.forward(pending + half-radius); pending = 0.0
             if label:
-                write(ch, font = (FONTNAME, FONTSIZE, FONTTYPE))
-            _turtle_turn_left(radius=radius, angle=ANGLE_90)
-            forward(half-radius)
+                t.write(ch, font = (FONTNAME, FONTSIZE, FONTTYPE))
+            if ch in ("R", "r"):
+                _turtle_turn_right(radius=radius, angle=ANGLE_90)
+            else:
+                _turtle_turn_left(radius=radius, angle=ANGLE_90)
+            pending += half-radius
         elif ch in ("S", "s"):
-            forward(0.5*full)
+            pending += 0.5*full
             if label:
-                write(ch, font = (FONTNAME, FONTSIZE, FONTTYPE))
-            forward(0.5*full)
+                t.forward(pending); pending = 0.0
+                t.write(ch, font = (FONTNAME, FONTSIZE, FONTTYPE))
+            pending += 0.5*full
+    t.forward(pending)
 
     if arrow_head: 
-        st()
+        t.st()
+
+
+class CompiledRules:
+    """
+    The folding rule P0 on {A,B} and Verrill's boundary rule P1 on {R,r,L,l,S,s} of a
+    folding sequence, together with the str.translate tables that apply them to a word.
+    """
+    def __init__(self, P0: dict, P1: dict):
+        self.P0 = P0
+        self.P1 = P1
+        self.folding = Substitution(P0)
+        self.boundary = Substitution(P1)
+        self.P0_table = self.folding.table
+        self.P1_table = self.boundary.table
+        self.folding_matrices = SubstitutionMatrices(P0, SQUAREGRID_LETTERS)
+        self.boundary_matrices = SubstitutionMatrices(P1, MIDGRID_LETTERS)
+
+
+_SWITCH_TABLE = str.maketrans({"A":"B", "B":"A", "+":"-","-":"+", "R":"L", "L":"R", "S":"S", "a":"a", "v":"v"})
+_CREATE_LEFT_TABLE = str.maketrans({"A": "R", "B": "R", "+": "a", "-": "v"})
+_CREATE_RIGHT_TABLE = str.maketrans({"A": "L", "B": "L", "+": "v", "-": "a"})
+# Invert of a boundary word is its reverse with R<->l and L<->r: the same curve walked backwards
+_BOUNDARY_INVERT_TABLE = str.maketrans("RlLrSs", "lRrLSs")
+# the same maps as bytes.translate tables, for Words
+_SWITCH_BYTES = bytes.maketrans(b"ABRL+-", b"BALR-+")
+_CREATE_LEFT_BYTES = bytes.maketrans(b"AB+-", b"RRav")
+_CREATE_RIGHT_BYTES = bytes.maketrans(b"AB+-", b"LLva")
+
+# byte value -> True for R and L, the letters that flip the case parity in alternate_cases
+_FLIPS_PARITY = np.zeros(256, dtype=bool)
+_FLIPS_PARITY[[ord("R"), ord("L")]] = True
+
+# Backtracking reduction rules: (X v Y) -> letter and (a/v a/v) -> a/v
+_REDUCE_XVY = {("R", "R"): "S", ("L", "L"): "S", ("R", "L"): "v", ("L", "R"): "v", ("S", "R"): "L",
+               ("S", "L"): "R", ("S", "S"): "v", ("R", "S"): "L", ("L", "S"): "R"}
+_REDUCE_AV = {"vv": "a", "aa": "a", "av": "v", "va": "v"}
+
+# folding sequence -> CompiledRules, shared by every FoldingSequence built from the same string and
+# bounded to the RULES_CACHE_SIZE most recently used sequences, so sweeps do not keep every sequence alive
+RULES_CACHE_SIZE = 1024
+_COMPILED_RULES = OrderedDict()
+
+
+def clear_rules(folding_sequence: str = None) -> None:
+    """Forget the compiled rules of `folding_sequence` (of every sequence if None); they are derived again on use."""
+    if folding_sequence is None:
+        _COMPILED_RULES.clear()
+    else:
+        _COMPILED_RULES.pop(folding_sequence, None)
 
 
 class FoldingSequence:
-    def __init__(self, folding_sequence: str):
+    def __init__(self, folding_sequence: str, cache: LevelCache = None):
+        """
+        Parameters:
+        folding_sequence (str): the folding sequence, a word over {+,-}.
+        cache (LevelCache): optional cache of the iterates P^k(c); when given, words of single-letter
+                            seeds are read from it (and built from the previous cached level) instead of
+                            being expanded from scratch on every call.
+        """
         self.folding_sequence = folding_sequence
+        self.cache = cache
+
+    @property
+    def rules(self) -> CompiledRules:
+        """The compiled P0/P1 tables of this folding sequence (derived once per sequence)."""
+        rules = _COMPILED_RULES.get(self.folding_sequence)
+        if rules is not None:
+            _COMPILED_RULES.move_to_end(self.folding_sequence)
+            return rules
+        rules = _COMPILED_RULES[self.folding_sequence] = self.compile_rules()
+        while len(_COMPILED_RULES) > RULES_CACHE_SIZE:
+            _COMPILED_RULES.popitem(last=False)
+        return rules
+
+    def compile_rules(self) -> CompiledRules:
+        """Derive P0, P1 and their tables from the folding sequence (uncached; `rules` keeps the result)."""
+        m = len(self.folding_sequence)
+        omega = ('A', 'B')
+        rule_A = "A"
+        for i in range(m):
+            rule_A = rule_A + self.folding_sequence[i] + omega[(i+1) % 2]
+        rule_B = self.inv_invert(rule_A)
+        P0 = {"A": rule_A, "B": rule_B}
+        return CompiledRules(P0, self._boundary_rules(rule_A))
 
     def inv_switch(self, w: str) -> str:
-        table = str.maketrans({"A":"B", "B":"A", "+":"-","-":"+", "R":"L", "L":"R", "S":"S", "a":"a", "v":"v"})
-        return w.translate(table)
+        if isinstance(w, Word):
+            return w.translate(_SWITCH_BYTES)
+        return w.translate(_SWITCH_TABLE)
 
     def inv_reverse(self, w: str) -> str:
         return w[::-1]
@@ -173,25 +296,19 @@ class FoldingSequence:
         return self.inv_reverse(self.inv_switch(w))
 
     def folding_morphism(self, D2_word: str):
-        m = len(self.folding_sequence)
-        omega = ('A', 'B')
-        rule_A = "A"
-        for i in range(m):
-            rule_A = rule_A + self.folding_sequence[i] + omega[(i+1) % 2]
-        rule_B = self.inv_invert(rule_A)
-        rules = {"A": rule_A, "B": rule_B}
-        D2_word = "".join(rules.get(c, c) for c in D2_word)
-        return D2_word
+        return self.rules.folding.apply(D2_word)
         
     # ---------------- Boundary algorithm (Verrill) ----------------
     # CreateLeft / CreateRight on {A,B,+,-}* -> intermediate {R,L,S,a,v}* (no S produced here)
     def create_left(self, D2_word: str) -> str:
-        mapping = {"A": "R", "B": "R", "+": "a", "-": "v"}
-        return "".join(mapping.get(c, c) for c in D2_word)
+        if isinstance(D2_word, Word):
+            return D2_word.translate(_CREATE_LEFT_BYTES)
+        return D2_word.translate(_CREATE_LEFT_TABLE)
 
     def create_right(self, D2_word: str) -> str:
-        mapping = {"A": "L", "B": "L", "+": "v", "-": "a"}
-        return "".join(mapping.get(c, c) for c in D2_word)
+        if isinstance(D2_word, Word):
+            return D2_word.translate(_CREATE_RIGHT_BYTES)
+        return D2_word.translate(_CREATE_RIGHT_TABLE)
 
     def _reduce_once(self, w: list) -> tuple[list, bool]:
         changed = False
@@ -231,31 +348,75 @@ class FoldingSequence:
         return out, changed
 
     def reduce_backtracking(self, w: str) -> str:
-        # Input over {R,L,S,a,v}*
-        arr = list(w)
-        changed = True
-        while changed:
-            arr, changed = self._reduce_once(arr)
-        # ensure no stray 'i' (not used), and return
-        return "".join(arr)
+        """
+        Reduce a word over {R,L,S,a,v}* with the (X v Y) and (a/v a/v) rewrite rules.
+        The result is exactly that of applying `_reduce_once` until nothing changes, but in linear time:
+        the word is a linked list rewritten in place, and after the first full pass a later pass can only
+        rewrite at, or up to two letters before, a letter produced by the previous pass, so only those
+        positions are rescanned (in word order, skipping letters consumed earlier in the same pass).
+        """
+        sym = list(str(w))
+        n = len(sym)
+        if n == 0:
+            return w
+        nxt = list(range(1, n + 1))  # n marks the end of the word
+        prv = list(range(-1, n - 1))
+        alive = [True] * n
+        candidates = range(n)
+        while candidates:
+            created = []  # letters rewritten in this pass, in word order
+            for p in candidates:
+                if not alive[p]:
+                    continue
+                q1 = nxt[p]
+                if q1 == n:
+                    continue
+                q2 = nxt[q1]
+                X, Y = sym[p], sym[q1]
+                if Y == "v" and q2 < n and X in "RLS" and sym[q2] in "RLS":
+                    sym[p] = _REDUCE_XVY[X, sym[q2]]
+                    alive[q1] = alive[q2] = False
+                    last = q2
+                elif X in "av" and Y in "av":
+                    sym[p] = _REDUCE_AV[X + Y]
+                    alive[q1] = False
+                    last = q1
+                else:
+                    continue
+                # the rewritten letter replaces the matched ones in place
+                nxt[p] = nxt[last]
+                if nxt[last] < n:
+                    prv[nxt[last]] = p
+                created.append(p)
+            # next pass: each new letter and the two letters before it, in word order
+            candidates, top = [], -1
+            for p in created:
+                a = prv[p]
+                b = prv[a] if a >= 0 else -1
+                for c in (b, a, p):
+                    if c > top:
+                        candidates.append(c)
+                        top = c
+        out, p = [], 0
+        while p < n:
+            out.append(sym[p])
+            p = nxt[p]
+        out = "".join(out)
+        return Word(out) if isinstance(w, Word) else out
 
     def remove_ai(self, w: str) -> str:
+        if isinstance(w, Word):
+            return w.select("RLS")
         return "".join(ch for ch in w if ch in "RLS")
 
     def alternate_cases(self, start_parity: int, base: str) -> str:
-        # base over {R,L,S}*
-        out = []
-        p = start_parity  # 0 -> even (upper), 1 -> odd (lower)
-        for ch in base:
-            if p == 0:
-                out.append(ch)  # uppercase already
-            else:
-                out.append({"R":"r","L":"l","S":"s"}[ch])
-            # update parity
-            if ch in "RL":
-                p = 1 - p
-            # if ch == 'S', parity unchanged
-        return "".join(out)
+        # base over {R,L,S}*; parity 0 -> even (upper), 1 -> odd (lower)
+        codes = Word(base).codes
+        # the parity before each letter: start_parity plus the number of R/L before it ('S' keeps it)
+        flips = _FLIPS_PARITY[codes].astype(np.uint8)
+        parity = (np.cumsum(flips, dtype=np.uint8) - flips + start_parity) & 1
+        out = Word(codes + 32 * parity.astype(np.uint8))  # 'R' + 32 == 'r', etc.
+        return out if isinstance(base, Word) else str(out)
 
     def initial_cases(self, P0A: str) -> tuple[int,int]:
         # p0 for R/L/S boundaries; p1 for r/l/s boundaries
@@ -263,44 +424,145 @@ class FoldingSequence:
         p1 = 1 if P0A[-1] == "A" else 0
         return p0, p1
 
-    def boundary_morphism(self, w: str) -> str:
+    def _boundary_rules(self, P0A: str) -> dict:
         """
-        Construct Verrill's boundary L-system map P1: Ω1* -> Ω1*,
-        from the folding rule P0 encoded by self.folding_sequence.
+        Construct Verrill's boundary L-system map P1: Ω1* -> Ω1* on the letters R,L,S,r,l,s,
+        from P0(A) of the folding rule encoded by self.folding_sequence.
         """
-        # Step 0: P0(A)
-        P0A = self.folding_morphism("A")
         # Step 1: CreateLeft / Right
-        wR_tilde = self.create_left(P0A)
-        wL_tilde = self.create_right(P0A)
+        with Stage("boundary_rules", "1 create") as stage:
+            wR_tilde = self.create_left(P0A)
+            wL_tilde = self.create_right(P0A)
+            stage.length = len(wR_tilde) + len(wL_tilde)
         # Step 2: Reduce backtracking
-        wR_red = self.reduce_backtracking(wR_tilde)
-        wL_red = self.reduce_backtracking(wL_tilde)
+        with Stage("boundary_rules", "2 reduce backtracking", len(wR_tilde) + len(wL_tilde)):
+            wR_red = self.reduce_backtracking(wR_tilde)
+            wL_red = self.reduce_backtracking(wL_tilde)
         # Step 3: Remove a/v for base paths
-        wR_base = self.remove_ai(wR_red)
-        wL_base = self.remove_ai(wL_red)
+        with Stage("boundary_rules", "3 remove a/v", len(wR_red) + len(wL_red)):
+            wR_base = self.remove_ai(wR_red)
+            wL_base = self.remove_ai(wL_red)
         # Step 4: initial parities
         p0, p1 = self.initial_cases(P0A)
         # Step 5: R, L
-        P1_R = self.alternate_cases(p0, wR_base)
-        P1_L = self.alternate_cases(p0, wL_base)
+        with Stage("boundary_rules", "5 R, L cases", len(wR_base) + len(wL_base)):
+            P1_R = self.alternate_cases(p0, wR_base)
+            P1_L = self.alternate_cases(p0, wL_base)
         # Step 6: r, l via invert of opposite boundary
-        w_r_base = self.remove_ai(self.inv_invert(wL_red))
-        w_l_base = self.remove_ai(self.inv_invert(wR_red))
-        P1_r = self.alternate_cases(p1, w_r_base)
-        P1_l = self.alternate_cases(p1, w_l_base)
+        with Stage("boundary_rules", "6 r, l", len(wR_red) + len(wL_red)):
+            w_r_base = self.remove_ai(self.inv_invert(wL_red))
+            w_l_base = self.remove_ai(self.inv_invert(wR_red))
+            P1_r = self.alternate_cases(p1, w_r_base)
+            P1_l = self.alternate_cases(p1, w_l_base)
         # Step 7: S, s via Reduce(R v invert(L)) (and its odd variant)
-        wS_tilde = self.reduce_backtracking(wR_red + "v" + self.inv_invert(wL_red))
-        wS_base = self.remove_ai(wS_tilde)
-        P1_S = self.alternate_cases(p0, wS_base)
+        with Stage("boundary_rules", "7 S, s", 2 * (len(wR_red) + len(wL_red) + 1)):
+            wS_tilde = self.reduce_backtracking(wR_red + "v" + self.inv_invert(wL_red))
+            wS_base = self.remove_ai(wS_tilde)
+            P1_S = self.alternate_cases(p0, wS_base)
 
-        ws_tilde = self.reduce_backtracking(self.inv_invert(wL_red) + "v" + wR_red)
-        ws_base = self.remove_ai(ws_tilde)
-        P1_s = self.alternate_cases(p1, ws_base)
+            ws_tilde = self.reduce_backtracking(self.inv_invert(wL_red) + "v" + wR_red)
+            ws_base = self.remove_ai(ws_tilde)
+            P1_s = self.alternate_cases(p1, ws_base)
 
-        table = str.maketrans({"R": P1_R, "L": P1_L, "S": P1_S, "r": P1_r, "l": P1_l, "s": P1_s})
-    
-        return w.translate(table)
+        return {"R": P1_R, "L": P1_L, "S": P1_S, "r": P1_r, "l": P1_l, "s": P1_s}
+
+    def boundary_morphism(self, w: str) -> str:
+        """
+        Apply Verrill's boundary L-system map P1: Ω1* -> Ω1* to `w`. The rules for P1 are
+        derived from the folding rule P0 once per folding sequence (see `rules`).
+        """
+        rules = self.rules
+        with Stage("boundary_morphism", "apply") as stage:
+            out = rules.boundary.apply(w)
+            stage.length = len(out)
+        return out
+
+    def _substitution(self, seed: str) -> Substitution:
+        # P0 acts on square-grid words, P1 on mid-grid (boundary) words
+        if all(c in "AB+-" for c in seed):
+            return self.rules.folding
+        return self.rules.boundary
+
+    def word(self, n: int, seed: str = "A", packed: bool = False):
+        """
+        P^n(seed) (or P1^n(seed) for a boundary seed) as a Word, built level by level with the gather
+        tables (or taken from the cache), or as a PackedWord at 2 bits per symbol if `packed` (folding words
+        only), packed chunk by chunk from the stream so the unpacked word is never held.
+        """
+        if self.cache is not None and len(seed) == 1:
+            w = self.cache.word(self, seed, n)
+        elif packed:
+            return PackedWord.from_chunks(self.iter_word(n, seed, CHUNK_SIZE), self.word_length(n, seed))
+        else:
+            w = self._substitution(seed).iterate(Word(seed), n)
+        return w.pack() if packed else w
+
+    def iter_word(self, n: int, seed: str = "A", chunk_size: int = None):
+        """
+        Stream P^n(seed) (or P1^n(seed) for a boundary seed such as 'R' or 'L') symbol by symbol,
+        or in strings of `chunk_size` symbols, without building the whole word. With a cache, the
+        word of a single-letter seed is read from the cache instead.
+        """
+        if self.cache is not None and len(seed) == 1:
+            word = self.cache.word(self, seed, n)
+            if chunk_size is None:  # symbol by symbol, from bounded chunks
+                return (c for chunk in word_chunks(word, CHUNK_SIZE) for c in str(chunk))
+            return (str(chunk) for chunk in word_chunks(word, chunk_size))
+        return self._substitution(seed).stream(seed, n, chunk_size)
+
+    def word_length(self, n: int, seed: str = "A") -> int:
+        """Length of P^n(seed) (or P1^n(seed) for a boundary seed)."""
+        return self._substitution(seed).length(seed, n)
+
+    def word_at(self, n: int, k: int, seed: str = "A") -> str:
+        """The k-th symbol of P^n(seed) (or P1^n(seed) for a boundary seed), without building the word."""
+        return self._substitution(seed).word_at(seed, n, k)
+
+    def _matrices(self, seed: str) -> SubstitutionMatrices:
+        if all(c in "AB+-" for c in seed):
+            return self.rules.folding_matrices
+        return self.rules.boundary_matrices
+
+    def letter_counts(self, n: int, seed: str = "A") -> dict:
+        """Exact letter counts of P^n(seed) (or P1^n(seed)) from the substitution matrix, without building the word."""
+        return self._matrices(seed).letter_counts(seed, n)
+
+    def end_point(self, n: int, seed: str = "A") -> tuple[int, int]:
+        """
+        Exact endpoint of the curve of P^n(seed) from heading 0, without building the word: square-grid
+        steps for a folding word, half grid steps (as in midgrid_end) for a boundary seed such as 'R'.
+        """
+        return self._matrices(seed).end(seed, n)
+
+    def is_self_avoiding(self, n: int, chunk_size: int = CHUNK_SIZE) -> bool:
+        """
+        True if the curve of P^n(A) never traverses a unit edge twice. Each edge is encoded as one integer
+        key and the streamed curve is checked chunk by chunk against the edges seen so far, stopping at the
+        first repeated edge. Memory grows with the number of edges (8 bytes each), never with the word.
+        """
+        walker = SquaregridWalker(dtype=np.int64)
+        seen = KeySet()
+        for chunk in self.iter_word(n, "A", chunk_size):
+            start = walker.position.copy()
+            keys = edge_keys(np.vstack([start, walker.feed(chunk)]))
+            if seen.add(keys) < len(keys):
+                return False
+        return True
+
+    def has_dimension_two(self) -> bool:
+        """
+        True if the similarity dimension log(#segments of P(A))/log|end(P(A))| equals 2, i.e. |end(P(A))|^2
+        equals the number of segments of P(A).
+        """
+        x, y = end_squaregrid_word(self.rules.P0["A"])
+        return x**2 + y**2 == len(self.folding_sequence) + 1
+
+    def is_plane_filling(self, n: int) -> bool:
+        """
+        True if the folding curve is plane-filling as far as level n can tell: P^n(A) is self-avoiding and
+        the similarity dimension is 2 (see has_dimension_two).
+        """
+        return self.has_dimension_two() and self.is_self_avoiding(n)
 
     def boundary_morphism_adjacency_matrix(self, vertex_set: list = ['R', 'L', 'S', 's']):
         """
@@ -312,15 +574,248 @@ class FoldingSequence:
         k = len(vertex_set)
         M = np.zeros((k, k), dtype=int)
 
+        P1 = self.rules.P1
         for i, src in enumerate(vertex_set):
-            img = self.boundary_morphism(src)
+            img = P1.get(src, src)
             for j, tgt in enumerate(vertex_set):
                 tgt_inv = invert_map.get(tgt, tgt)
                 # Count letters in img equal to tgt or its invert
-                M[i, j] = sum(1 for ch in img if ch == tgt or ch == tgt_inv)
+                M[i, j] = img.count(tgt) + (img.count(tgt_inv) if tgt_inv != tgt else 0)
 
         return M
 
+    def boundary_graph(self, vertex_set: tuple = ('R', 'L', 'S', 's'), seeds: tuple = ('R', 'L')) -> dict:
+        """
+        The graph-directed IFS of the boundary in exact Gaussian integers. The net turns T_i of P1^i are
+        periodic from some level k on, with period p, and the boundary scales exactly there:
+        D_{i+p} = z^p D_i for the displacements D_i of P1^i and z = end(P(A)). So the piece K_u, the limit of
+        z^(-tp) C(P1^(k+tp)(u)) (C the mid-grid curve, in half grid steps), splits along P1^p(u) = X_1 ... X_m:
+            K_u = union over j of z^(-p) (i^h_j K_{X_j} + t_j),
+        where h_j and t_j are the net turn and endpoint of P1^k(X_1 ... X_{j-1}). A piece X outside
+        `vertex_set` is the invert of a vertex Y (reverse, R<->l, L<->r), i.e. K_Y walked backwards:
+        K_X = i^(-T_k(Y)-2) (K_Y - D_k(Y)).
+
+        Parameters:
+        vertex_set (tuple): letters kept as vertices, as in boundary_morphism_adjacency_matrix.
+        seeds (tuple): the graph is restricted to the vertices reachable from these.
+
+        Returns a dict with "vertices" (the reachable letters in the order of `vertex_set`: vertex 1, 2, ...
+        of to_graph_directed_ifs), "scale" (z^p as (x, y)), "level" (k), "period" (p), "displacements"
+        ({u: D_k(u) as (x, y)}) and "edges" ({u: [(v, h, (x, y)), ...]} for the maps
+        K_v -> z^(-p) (i^h K_v + x + iy) into K_u, in the order of P1^p(u)).
+        Raises ValueError if the boundary does not scale exactly, as when the curve is not self-avoiding
+        and plane-filling.
+        """
+        matrices = self.rules.boundary_matrices
+        P1 = self.rules.P1
+        # 1. level k from which the turns repeat, and z^p
+        _, k, p = matrices.turn_cycle()
+        (re, im), T = matrices.level(k)
+        (re_p, im_p), _ = matrices.level(k + p)
+        x, y = squaregrid_end(self.rules.P0["A"])
+        zx, zy = 1, 0
+        for _ in range(p):
+            zx, zy = zx * x - zy * y, zx * y + zy * x
+
+        # 2. the pieces are exact only if the boundary scales by z^p and inverts commute with P1
+        scales = x * x + y * y > 1 and all(re_p[a] == zx * re[a] - zy * im[a] and im_p[a] == zx * im[a] + zy * re[a]
+                                           for a in range(len(matrices.alphabet)))
+        commutes = all(P1.get(c.translate(_BOUNDARY_INVERT_TABLE), c) == P1.get(c, c)[::-1].translate(_BOUNDARY_INVERT_TABLE)
+                       for c in MIDGRID_ALPHABET)
+        if not (scales and commutes):
+            raise ValueError(f"the boundary of {self.folding_sequence} does not scale exactly by end(P(A)); "
+                             "is the curve self-avoiding and plane-filling?")
+        D = {c: (int(re[a]), int(im[a])) for c, a in matrices.index.items()}
+        turn = {c: T[a] for c, a in matrices.index.items()}
+
+        def rotate(h: int, v: tuple) -> tuple:
+            cos, sin = I_POWERS[h]
+            return cos * v[0] - sin * v[1], sin * v[0] + cos * v[1]
+
+        # 3. one map per letter of P1^p(u), inverts mapped back to their vertex
+        edges = {}
+        for u in vertex_set:
+            pieces, h, t = [], 0, (0, 0)
+            for X in str(self.word(p, u)):
+                if X in vertex_set:
+                    pieces.append((X, h, t))
+                else:
+                    Y = X.translate(_BOUNDARY_INVERT_TABLE)
+                    if Y not in vertex_set:
+                        raise ValueError(f"neither {X} nor its invert {Y} is in the vertex set {vertex_set}")
+                    g = (h - turn[Y] - 2) % 4
+                    d = rotate(g, D[Y])
+                    pieces.append((Y, g, (t[0] - d[0], t[1] - d[1])))
+                d = rotate(h, D[X])
+                t = (t[0] + d[0], t[1] + d[1])
+                h = (h + turn[X]) % 4
+            edges[u] = pieces
+
+        # 4. the vertices reachable from the seeds
+        reached, todo = set(seeds), list(seeds)
+        while todo:
+            for v, _, _ in edges[todo.pop()]:
+                if v not in reached:
+                    reached.add(v)
+                    todo.append(v)
+        vertices = [v for v in vertex_set if v in reached]
+        return {"vertices": vertices, "scale": (zx, zy), "level": k, "period": p,
+                "displacements": {v: D[v] for v in vertices}, "edges": {v: edges[v] for v in vertices}}
+
+    def to_graph_directed_ifs(self, vertex_set: tuple = ('R', 'L', 'S', 's'), seeds: tuple = ('R', 'L'),
+                              probs=None):
+        """
+        The boundary_graph as a GraphDirectedIFS in R^2: vertex n is boundary_graph(...)["vertices"][n-1],
+        and its attractor K_n is the boundary piece of that letter, in half grid steps at level k.
+
+        Parameters:
+        vertex_set (tuple): letters kept as vertices.
+        seeds (tuple): the graph is restricted to the vertices reachable from these.
+        probs: edge probabilities of the chaos game, as in GraphDirectedIFS.
+        """
+        from .IFS import GraphDirectedIFS  # imports matplotlib, so only on first use
+
+        graph = self.boundary_graph(vertex_set, seeds)
+        number = {v: n for n, v in enumerate(graph["vertices"], 1)}
+        # z^(-p) = conj(z^p) / |z^p|^2
+        zx, zy = graph["scale"]
+        norm = zx * zx + zy * zy
+        edges = {}
+        for u in graph["vertices"]:
+            edges[number[u]] = []
+            for v, h, (tx, ty) in graph["edges"][u]:
+                cos, sin = I_POWERS[h]
+                a, b = (zx * cos + zy * sin) / norm, (zx * sin - zy * cos) / norm
+                A = np.array([[a, -b], [b, a]])
+                t = np.array([zx * tx + zy * ty, zx * ty - zy * tx]) / norm
+                edges[number[u]].append((number[v], (A, t)))
+        return GraphDirectedIFS(2, len(graph["vertices"]), edges, probs)
+
+    def _drawing_frame(self, i: int) -> tuple:
+        """Scaling factor |end(P(A))|, its angle in degrees, and the start headings of the R and L boundaries at level i."""
+        # Boundary start headings (SVG/turtle screen coords: +y is up in turtle)
+        # Map JS Bdirs to turtle angles:
+        #   NE: 45°,  NW: 135°,  SW: 225°,  SE: 315°   (turtle 0°=+x, CCW positive)
+        starts_with_A = (self.word_at(i, 0) == "A")
+        if starts_with_A:
+            base_R = 45.0    # NE for right boundary
+            base_L = 315.0   # SE for left boundary
+        else:
+            base_R = 135.0   # NW
+            base_L = 45.0    # NE
+
+        (x,y) = end_squaregrid_word(self.rules.P0["A"])
+        factor = np.sqrt(x**2 + y**2)
+        angle = np.arctan2(y,x) * 180/np.pi
+        return factor, angle, base_R, base_L
+
+    def _curve_frame(self, i: int, seed: str, step: float) -> tuple:
+        # the walker of the ith curve from `seed` and the matrix taking its coordinates to the drawing frame
+        factor, angle, base_R, base_L = self._drawing_frame(i)
+        unit = step/(factor**i)
+        if seed in ("A", "B"):
+            walker, scale, theta = SquaregridWalker(), unit, -i*angle
+        else:
+            # mid-grid walkers start along 45° and count in half grid steps
+            base = base_R if seed == "R" else base_L
+            walker, scale, theta = MidgridWalker(), 0.5*unit, base - i*angle - 45.0
+        theta = np.radians(theta)
+        return walker, scale * np.array([[np.cos(theta), np.sin(theta)], [-np.sin(theta), np.cos(theta)]])
+
+    def curve_bounds(self, i: int, seed: str = "A", step: float = 12.0, max_letters: int = 1 << 12) -> tuple:
+        """
+        A bounding box (xmin, ymin, xmax, ymax) of curve_points(i, seed, step), without walking the curve.
+        P^i(seed) is P^m(seed), of at most `max_letters` letters, with every letter c replaced by the curve
+        of P^k(c), k = i - m. Its junctions are walked exactly with the displacements and turns of level k,
+        and each sub-curve lies in a ball around its start of radius E_k(c), where E_0(c) = |d(c)| and
+        E_(l+1)(c) = max over the letters X_j of P(c) of |position of X_j| + E_l(X_j) at level l.
+        """
+        matrices = self._matrices(seed)
+        m = 0
+        while m < i and self.word_length(m + 1, seed) <= max_letters:
+            m += 1
+        k = i - m
+        # 1. radii E_k of the sub-curves, per letter
+        (re, im), T = matrices.level(0)
+        E = np.hypot(re.astype(float), im.astype(float))
+        for level in range(k):
+            (re, im), T = matrices.level(level)
+            new = np.zeros_like(E)
+            for a, image in enumerate(matrices.images):
+                x = y = 0
+                heading = 0
+                for c in image:
+                    b = matrices.index[c]
+                    new[a] = max(new[a], np.hypot(x, y) + E[b])
+                    cos, sin = I_POWERS[heading]
+                    x, y = x + cos * re[b] - sin * im[b], y + sin * re[b] + cos * im[b]
+                    heading = (heading + T[b]) % 4
+                new[a] = max(new[a], np.hypot(x, y))
+            E = new
+        # 2. junctions of the level-k sub-curves along P^m(seed), with their radii
+        (re, im), T = matrices.level(k)
+        word = str(self.word(m, seed))
+        points, radii = np.zeros((len(word) + 1, 2)), np.zeros(len(word) + 1)
+        x = y = 0
+        heading = 0
+        for j, c in enumerate(word):
+            b = matrices.index[c]
+            points[j], radii[j] = (x, y), E[b]
+            cos, sin = I_POWERS[heading]
+            x, y = x + cos * re[b] - sin * im[b], y + sin * re[b] + cos * im[b]
+            heading = (heading + T[b]) % 4
+        points[-1] = (x, y)
+        # 3. in the drawing frame (M is a similarity, so the radii scale by its ratio)
+        _, M = self._curve_frame(i, seed, step)
+        points = points @ M
+        radii = radii * np.sqrt(abs(np.linalg.det(M)))
+        lo, hi = (points - radii[:, None]).min(axis=0), (points + radii[:, None]).max(axis=0)
+        return lo[0], lo[1], hi[0], hi[1]
+
+    def curve_points(self, i: int, seed: str = "A", step: float = 12.0, chunk_size: int = CHUNK_SIZE):
+        """
+        Yield the vertices of the ith curve drawn from `seed` (the folding curve for 'A', the right/left
+        boundary for 'R'/'L') in chunks of float (k, 2) arrays, in the scaled and rotated frame used by
+        turtledraw_foldingcurve (with sharp corners). Consecutive chunks share their end/start vertex.
+        """
+        walker, M = self._curve_frame(i, seed, step)
+        for chunk in self.iter_word(i, seed, chunk_size):
+            start = walker.position.copy()
+            yield np.vstack([start, walker.feed(chunk)]) @ M
+
+    def rasterdraw_foldingcurve(self,
+                    i: int,
+                    filename: str = "folding.png",
+                    size: int = 1024,
+                    draw_curve: bool = True,
+                    draw_boundary: bool = False,
+                    curve_colour: str = "#000000",
+                    left_colour: str = "#ff6b6b",
+                    right_colour: str = "#1e90ff",
+                    background: str = "#ffffff") -> None:
+        """
+        Render the ith folding curve and (optionally) its right/left boundaries as a density raster with `size`
+        pixels along the longer side, for levels far too deep for vector output. Memory use is fixed at any level.
+        Saves a PNG (curve first, boundaries composited over it) or, for a .npy filename, the raw
+        per-channel densities (length of curve per pixel).
+        """
+        if not (draw_curve or draw_boundary):
+            raise ValueError("nothing to draw: set draw_curve or draw_boundary")
+        layers = []  # (seed, colour) in compositing order
+        if draw_curve:
+            layers.append(("A", curve_colour))
+        if draw_boundary:
+            layers += [("R", left_colour), ("L", right_colour)]
+
+        # two passes over the streamed words: bounding box first, then binning
+        xmin, ymin, xmax, ymax = polyline_bounds(chunk for seed, _ in layers for chunk in self.curve_points(i, seed))
+        pad = 0.01 * max(xmax - xmin, ymax - ymin)
+        raster = DensityRaster((xmin - pad, ymin - pad, xmax + pad, ymax + pad), size, len(layers))
+        for k, (seed, _) in enumerate(layers):
+            for chunk in self.curve_points(i, seed):
+                raster.add_polyline(k, chunk)
+        raster.save(filename, [colour for _, colour in layers], background)
+
     def turtledraw_foldingcurve(self,
                     i: int,
                     step: float = 12.0,
@@ -333,51 +828,52 @@ class FoldingSequence:
                     curve_width: float = 2.5,
                     boundary_width: float = 3.0,
                     arrow_head: bool = False,
-                    rounded_corners: float = 0.2) -> None:
+                    rounded_corners: float = 0.2,
+                    backend: str = "turtle",
+                    tolerance: float = 0.5,
+                    size: int = None) -> None:
         """
         Render the ith square-grid folding curve generated by our folding sequence (L^{-n}C(P^n(A))) and (optionally) its
         right/left boundaries using Python turtle, then save to SVG via canvasvg.
+        With backend="svg" the curves are instead written headlessly, chunk by chunk, straight to the SVG file.
+        Level of detail: the drawing spans about `step` units, shown at one unit per pixel or, if given, at `size`
+        pixels across. Detail below `tolerance` pixels is dropped: corners rounded by less are drawn sharp, and
+        sharp-cornered SVG paths are simplified to within it (tolerance=0 draws every corner as it is).
         """
-        # 1) Build P^n_σ(A)
-        w = "A"
-        for _ in range(i):
-            w = self.folding_morphism(w)
+        if backend not in ("turtle", "svg"):
+            raise ValueError(f"unknown backend {backend!r}")
+        chunk_size = CHUNK_SIZE if backend == "svg" else None
+        scope = "turtledraw_foldingcurve"  # stage records, when profiling (see profiling.py)
 
-        # 2) Iterate Verrill boundary map on seeds 'R' and 'L'
-        def iterate_boundary(seed: str, n: int) -> str:
-            b = seed
-            for _ in range(n):
-                b = self.boundary_morphism(b)
-            return b
+        # 1) Stream P^n_σ(A) (the word is never built in full)
+        w = stream(self.iter_word(i, "A", chunk_size), scope, "1 build P^n(A)")
 
+        # 2) Stream iterates of Verrill boundary map on seeds 'R' and 'L'
         br, bl = "", ""
         if draw_boundary:  
-            br = iterate_boundary("R", i)
-            bl = iterate_boundary("L", i) 
-
-        # 5) Boundary start headings (SVG/turtle screen coords: +y is up in turtle)
-        # Map JS Bdirs to turtle angles:
-        #   NE: 45°,  NW: 135°,  SW: 225°,  SE: 315°   (turtle 0°=+x, CCW positive)
-        starts_with_A = (w[0] == "A")
-        if starts_with_A:
-            base_R = 45.0    # NE for right boundary
-            base_L = 315.0   # SE for left boundary
-        else:
-            base_R = 135.0   # NW
-            base_L = 45.0    # NE
+            br = stream(self.iter_word(i, "R", chunk_size), scope, "2 iterate boundary R")
+            bl = stream(self.iter_word(i, "L", chunk_size), scope, "2 iterate boundary L")
 
-        (x,y) = end_squaregrid_word(self.folding_morphism("A"))
-        factor = np.sqrt(x**2 + y**2)
-        angle = np.arctan2(y,x) * 180/np.pi
+        # 5) Boundary start headings, scaling factor and rotation of L
+        with Stage(scope, "5 compute heading"):
+            factor, angle, base_R, base_L = self._drawing_frame(i)
+        tolerance = tolerance * (step / size if size else 1.0)  # in drawing units
 
         # 6) Draw in order: boundaries first
-        if draw_boundary:
-            draw_midgrid_word(word=br, step=step/(factor**i), initial_angle=base_R - i*angle, pen_colour=left_colour, pen_width=boundary_width, rounded_corners=rounded_corners)
-            draw_midgrid_word(word=bl, step=step/(factor**i), initial_angle=base_L - i*angle, pen_colour=right_colour, pen_width=boundary_width, rounded_corners=rounded_corners)
-        if draw_curve:
-            draw_sqauregrid_word(word=w, step=step/(factor**i), initial_angle=-i*angle, pen_colour=curve_colour, pen_width=curve_width, arrow_head=arrow_head, rounded_corners=rounded_corners)
-
-        # 7) Save SVG & close and supress warning
-        save_canvas_svg(filename)
-        clearscreen()
+        with (svg.SVGWriter(filename) if backend == "svg" else nullcontext()) as writer:
+            if draw_boundary:
+                with Stage(scope, "6 draw boundary R", self.word_length(i, "R")):
+                    draw_midgrid_word(word=br, step=step/(factor**i), initial_angle=base_R - i*angle, pen_colour=left_colour, pen_width=boundary_width, rounded_corners=rounded_corners, writer=writer, tolerance=tolerance)
+                with Stage(scope, "6 draw boundary L", self.word_length(i, "L")):
+                    draw_midgrid_word(word=bl, step=step/(factor**i), initial_angle=base_L - i*angle, pen_colour=right_colour, pen_width=boundary_width, rounded_corners=rounded_corners, writer=writer, tolerance=tolerance)
+            if draw_curve:
+                with Stage(scope, "6 draw curve", self.word_length(i)):
+                    draw_sqauregrid_word(word=w, step=step/(factor**i), initial_angle=-i*angle, pen_colour=curve_colour, pen_width=curve_width, arrow_head=arrow_head, rounded_corners=rounded_corners, writer=writer, tolerance=tolerance)
+
+            # 7) Save SVG & close and supress warning
+            with Stage(scope, "7 save SVG"):
+                if writer is not None:
+                    writer.close()
+                else:
+                    save_canvas_svg(filename)
 
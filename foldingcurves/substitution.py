@@ -0,0 +1,136 @@
+"""
+Iterating a substitution (a morphism of free monoids given by letter -> word rules) without
+building the full iterate P^n(w) in memory.
+Letters without a rule are fixed by the substitution (e.g. '+' and '-' under P0).
+Strings are rewritten with str.translate, Words (byte arrays) with one gather over the rule images.
+"""
+import numpy as np
+from .word import Word, GatherTable
+
+# Blocks P^d(c) up to this length are expanded in one go at the bottom of the depth-first walk
+BLOCK_SIZE = 4096
+
+
+def _concatenate(parts: list) -> np.ndarray:
+    return np.concatenate(parts) if parts else np.zeros(0, dtype=np.uint8)
+
+
+class Substitution:
+    def __init__(self, rules: dict):
+        """
+        Parameters:
+        rules (dict): maps each substituted letter to its image, e.g. {"A": "A+B", "B": "A-B"}.
+        """
+        self.rules = rules
+        self.table = str.maketrans(rules)
+        self.gather = GatherTable(rules)
+        self.alphabet = set(rules) | set("".join(rules.values()))
+        self._lengths = [{c: 1 for c in self.alphabet}]  # _lengths[k][c] = len(P^k(c))
+
+    def apply(self, word):
+        """P(word), as a Word if `word` is a Word and as a str otherwise."""
+        if isinstance(word, Word):
+            return Word(self.gather.apply(word.codes))
+        return word.translate(self.table)
+
+    def lengths(self, n: int) -> dict:
+        """Return {c: len(P^n(c))} as exact integers, extending the cached levels as needed."""
+        while len(self._lengths) <= n:
+            prev = self._lengths[-1]
+            self._lengths.append({c: sum(prev[x] for x in self.rules[c]) if c in self.rules else 1
+                                  for c in self.alphabet})
+        return self._lengths[n]
+
+    def length(self, seed: str, n: int) -> int:
+        """Length of P^n(seed)."""
+        lengths = self.lengths(n)
+        return sum(lengths.get(c, 1) for c in seed)
+
+    def iterate(self, seed, n: int):
+        """Build P^n(seed) in one piece, as a Word if `seed` is a Word and as a str otherwise."""
+        if isinstance(seed, Word) and len(seed) <= len(self.alphabet):
+            # short seeds: build P^k(c) for every letter c, each level one concatenation per letter
+            levels = {c: Word(c).codes for c in self.alphabet}
+            for _ in range(n):
+                levels = {c: _concatenate([levels[x] for x in self.rules[c]]) if c in self.rules else levels[c]
+                          for c in self.alphabet}
+            return Word(_concatenate([levels.get(c, Word(c).codes) for c in str(seed)]))
+        w = seed
+        for _ in range(n):
+            w = self.apply(w)
+        return w
+
+    def _blocks(self, seed: str, n: int, block_size: int):
+        """
+        Walk the substitution tree of P^n(seed) depth-first and yield consecutive pieces of it.
+        The bottom d levels are replaced by the precomputed blocks P^d(c), where d is the largest
+        depth for which every block has at most `block_size` letters.
+        """
+        d = 0
+        while d < n and max(self.lengths(d + 1).values()) <= block_size:
+            d += 1
+        blocks = {c: self.iterate(c, d) for c in self.rules}
+        top = n - d  # levels walked explicitly
+        if top == 0:
+            for c in seed:
+                yield blocks.get(c, c)
+            return
+
+        stack = [iter(seed)]
+        while stack:
+            c = next(stack[-1], None)
+            if c is None:
+                stack.pop()
+            elif c not in self.rules:
+                yield c
+            elif len(stack) > top:
+                yield blocks[c]
+            else:
+                stack.append(iter(self.rules[c]))
+
+    def stream(self, seed: str, n: int, chunk_size: int = None):
+        """
+        Yield P^n(seed) symbol by symbol, or as strings of exactly `chunk_size` symbols
+        (the last one may be shorter) if `chunk_size` is given.
+        Memory use is bounded by the chunk size and the depth n, not by the length of P^n(seed).
+        """
+        if chunk_size is None:
+            for block in self._blocks(seed, n, BLOCK_SIZE):
+                yield from block
+            return
+
+        buf, size = [], 0
+        for block in self._blocks(seed, n, max(BLOCK_SIZE, chunk_size)):
+            buf.append(block)
+            size += len(block)
+            if size >= chunk_size:
+                s = "".join(buf)
+                full = size - size % chunk_size
+                for start in range(0, full, chunk_size):
+                    yield s[start:start + chunk_size]
+                buf, size = [s[full:]], size - full
+        if size:
+            yield "".join(buf)
+
+    def word_at(self, seed: str, n: int, k: int) -> str:
+        """
+        Return the k-th symbol (0-indexed) of P^n(seed) in O(n * |rule|) steps by descending
+        the substitution tree with the precomputed level lengths.
+        """
+        total = self.length(seed, n)
+        if k < 0:
+            k += total
+        if not 0 <= k < total:
+            raise IndexError(f"index {k} out of range for a word of length {total}")
+
+        word, level = seed, n
+        while True:
+            lengths = self.lengths(level)
+            for c in word:
+                size = lengths.get(c, 1)
+                if k < size:
+                    break
+                k -= size
+            if level == 0 or c not in self.rules:
+                return c
+            word, level = self.rules[c], level - 1
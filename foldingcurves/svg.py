@@ -0,0 +1,258 @@
+"""
+Headless SVG backend for square-grid and mid-grid words.
+
+Words are traced the way the turtle draws them (straight moves, sharp or rounded 90° turns) and
+written straight to the file as compact relative <path> data: each straight run between two turns
+is a single 'l' command and each rounded corner a single 'a' command. Only the current chunk of
+the word is held in memory, so the file can be written for curves of any length.
+"""
+import numpy as np
+from .geometry import encode, simplify_polyline
+from .word import word_chunks
+
+FONTNAME = "Times New Roman"
+FONTSIZE = 12
+# turtle's "classic" arrow shape as (forward, left) offsets from its tip
+ARROW_SHAPE = np.array([[0.0, 0.0], [-9.0, -5.0], [-7.0, 0.0], [-9.0, 5.0]])
+_HEADER_SPACE = 160  # characters reserved for the width/height/viewBox attributes
+
+
+class SVGWriter:
+    """
+    Write an SVG document element by element. The bounding box is only known once everything has
+    been drawn, so space for it is reserved in the <svg> tag and filled in on close().
+    Coordinates passed to the writer are SVG (y-down) coordinates.
+    """
+    def __init__(self, filename: str, precision: int = 2, margin: float = 2.0):
+        self.filename = filename
+        self.precision = precision
+        self.margin = margin
+        self.bbox = [np.inf, np.inf, -np.inf, -np.inf]
+        self.arrow = None  # like the turtle, only the last drawing shows its arrow head
+        self._file = open(filename, "w")
+        self._file.write('<?xml version="1.0" ?>\n<svg xmlns="http://www.w3.org/2000/svg"')
+        self._header_at = self._file.tell()
+        self._file.write(" " * _HEADER_SPACE + ">\n")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def write(self, element: str) -> None:
+        self._file.write(element)
+
+    def include(self, xmin: float, ymin: float, xmax: float, ymax: float) -> None:
+        """Grow the bounding box of the drawing."""
+        b = self.bbox
+        self.bbox = [min(b[0], xmin), min(b[1], ymin), max(b[2], xmax), max(b[3], ymax)]
+
+    def close(self) -> None:
+        if self._file.closed:
+            return
+        if self.arrow is not None:
+            self.write(self.arrow)
+        self._file.write("</svg>\n")
+        xmin, ymin, xmax, ymax = self.bbox
+        if xmin > xmax:  # nothing drawn
+            xmin = ymin = xmax = ymax = 0.0
+        xmin, ymin = np.floor(xmin - self.margin), np.floor(ymin - self.margin)
+        xmax, ymax = np.ceil(xmax + self.margin), np.ceil(ymax + self.margin)
+        w, h = xmax - xmin, ymax - ymin
+        attrs = f' width="{w:.3f}" height="{h:.3f}" viewBox="{xmin:.3f} {ymin:.3f} {w:.3f} {h:.3f}"'
+        if len(attrs) > _HEADER_SPACE:
+            self._file.close()
+            raise ValueError(f"the <svg> attributes of {self.filename} need {len(attrs)} characters, "
+                             f"only {_HEADER_SPACE} are reserved")
+        self._file.seek(self._header_at)
+        self._file.write(attrs.ljust(_HEADER_SPACE))
+        self._file.close()
+
+
+def _num(v: float) -> str:
+    s = repr(float(v))
+    return s[:-2] if s.endswith(".0") else s
+
+
+class MoveTable:
+    """
+    How the turtle moves on each symbol, as lookup tables indexed by the symbol's byte value:
+    a straight move `pre`, a quarter turn `turn` (+1 left, -1 right, 0 none) then a straight move `post`.
+    `label_at` is how far into the symbol its label is written and `align` the label's text anchor.
+    """
+    def __init__(self, moves: dict, label_at: dict, align: dict):
+        self.pre = np.zeros(256)
+        self.turn = np.zeros(256, dtype=np.int8)
+        self.post = np.zeros(256)
+        self.label_at = np.zeros(256)
+        for c, (pre, turn, post) in moves.items():
+            self.pre[ord(c)], self.turn[ord(c)], self.post[ord(c)] = pre, turn, post
+            self.label_at[ord(c)] = label_at[c]
+        self.align = {ord(c): a for c, a in align.items()}
+        self.symbols = np.zeros(256, dtype=bool)
+        self.symbols[[ord(c) for c in moves]] = True
+
+
+def squaregrid_moves(step: float, radius: float) -> MoveTable:
+    """'A'/'B' forward (step - 2*radius), '+' right 90°, '-' left 90°, as in draw_sqauregrid_word."""
+    straight = step - 2 * radius
+    return MoveTable({"A": (straight, 0, 0.0), "B": (straight, 0, 0.0), "+": (0.0, -1, 0.0), "-": (0.0, 1, 0.0)},
+                     label_at={"A": 0.5 * straight, "B": 0.5 * straight, "+": 0.0, "-": 0.0},
+                     align={"A": "middle", "B": "end", "+": "start", "-": "start"})
+
+
+def midgrid_moves(step: float, radius: float) -> MoveTable:
+    """R/r, L/l: half-step, right/left 90°, half-step; S/s: full step, as in draw_midgrid_word."""
+    full = step * np.sqrt(2.0)
+    half = 0.5 * full
+    moves, label_at = {}, {}
+    for c, turn in (("R", -1), ("r", -1), ("L", 1), ("l", 1)):
+        moves[c] = (half - radius, turn, half - radius)
+        label_at[c] = half - radius
+    for c in "Ss":
+        moves[c] = (full, 0, 0.0)
+        label_at[c] = 0.5 * full
+    return MoveTable(moves, label_at, align={c: "start" for c in moves})
+
+
+class TurtlePath:
+    """
+    Trace a word fed in chunks with the moves of a MoveTable and write it to an SVGWriter.
+    Straight runs between turns are merged into one command and pending straight moves are carried
+    from one chunk to the next. Path data is written in integer units of 10^-precision
+    (scaled back by the path's transform) and split into <path> elements of bounded size.
+    With a `tolerance`, sharp-cornered paths are simplified (simplify_polyline) to within it.
+    """
+    def __init__(self, writer: SVGWriter, moves: MoveTable, initial_angle: float, radius: float,
+                 pen_colour: str, pen_width: float, max_commands: int = 1 << 18, tolerance: float = 0.0):
+        self.writer = writer
+        self.moves = moves
+        self.radius = radius if radius and radius > 0 else 0.0
+        self.tolerance = tolerance
+        theta = np.radians(initial_angle + 90.0 * np.arange(4))
+        self.units = np.column_stack([np.cos(theta), np.sin(theta)])  # turtle (y-up) unit vectors
+        self.heading = 0
+        self.position = np.zeros(2)
+        self.pending = 0.0  # straight distance travelled since the last turn, not yet written
+        self.scale = 10 ** writer.precision
+        self.q = np.zeros(2, dtype=np.int64)  # last written point, in integer units
+        self.parts, self.count, self.max_commands = [], 0, max_commands
+        self.colour = pen_colour
+        transform = f' transform="scale({_num(1 / self.scale)})"' if self.scale != 1 else ""
+        self.style = (f'{transform} fill="none" stroke="{pen_colour}" stroke-width="{_num(pen_width * self.scale)}"'
+                      f' stroke-linecap="round" stroke-linejoin="round"')
+        self.pad = self.radius + pen_width
+        writer.arrow = None
+
+    def forward(self, distance: float) -> None:
+        self.pending += distance
+
+    def _emit(self, points: np.ndarray, turns: np.ndarray) -> None:
+        """Append commands moving through `points`: a line where turns == 0, else a right/left arc."""
+        if self.tolerance > 0 and self.radius == 0:
+            points = simplify_polyline(np.vstack([self.q / self.scale, points]), self.tolerance)[1:]
+            turns = np.zeros(len(points), dtype=np.int64)
+        q = np.round(points * self.scale).astype(np.int64)
+        d = np.diff(np.vstack([self.q, q]), axis=0)
+        keep = (d != 0).any(axis=1)
+        d, turns = d[keep], turns[keep]
+        if len(d):
+            if not self.parts:
+                self.parts.append(f"M{self.q[0]} {-self.q[1]}")
+            dx, dy = d[:, 0].tolist(), (-d[:, 1]).tolist()
+            if self.radius == 0:
+                self.parts.append("l" + " ".join(f"{x} {y}" for x, y in zip(dx, dy)))
+            else:
+                r = int(round(self.radius * self.scale))
+                prefix = {0: "l", -1: f"a{r} {r} 0 0 1 ", 1: f"a{r} {r} 0 0 0 "}
+                self.parts.append("".join(f"{prefix[t]}{x} {y}" for t, x, y in zip(turns.tolist(), dx, dy)))
+            self.count += len(d)
+            lo = np.minimum(self.q, q.min(axis=0)) / self.scale - self.pad
+            hi = np.maximum(self.q, q.max(axis=0)) / self.scale + self.pad
+            self.writer.include(lo[0], -hi[1], hi[0], -lo[1])
+        self.q = q[-1]
+        if self.count >= self.max_commands:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write the path built so far as one <path> element."""
+        if self.parts:
+            self.writer.write(f'<path d="{"".join(self.parts)}"{self.style}/>\n')
+        self.parts, self.count = [], 0
+
+    def feed(self, chunk, label: bool = False) -> None:
+        codes = encode(chunk)
+        codes = codes[self.moves.symbols[codes]]
+        pre, turn, post = self.moves.pre[codes], self.moves.turn[codes], self.moves.post[codes]
+        if label:
+            self._write_labels(codes, pre, turn, post)
+
+        J = np.flatnonzero(turn)
+        total = pre + post
+        if len(J) == 0:
+            self.pending += total.sum()
+            return
+        C = np.concatenate(([0.0], np.cumsum(total)))
+        t = turn[J].astype(np.int64)
+        legs = np.empty(len(J))
+        legs[0] = self.pending + C[J[0]] + pre[J[0]]
+        legs[1:] = C[J[1:]] - C[J[:-1] + 1] + post[J[:-1]] + pre[J[1:]]
+        self.pending = post[J[-1]] + C[-1] - C[J[-1] + 1]
+
+        h_after = (self.heading + np.cumsum(t)) % 4
+        h_before = (h_after - t) % 4
+        disp = np.empty((2 * len(J), 2))
+        disp[0::2] = legs[:, None] * self.units[h_before]
+        disp[1::2] = self.radius * (self.units[h_before] + self.units[h_after])
+        points = self.position + np.cumsum(disp, axis=0)
+        turns = np.zeros(2 * len(J), dtype=np.int64)
+        turns[1::2] = t
+
+        self._emit(points, turns)
+        self.position = points[-1]
+        self.heading = int(h_after[-1])
+
+    def _write_labels(self, codes, pre, turn, post) -> None:
+        # position and heading at the start of every symbol, then move `label_at` into it
+        h_after = (self.heading + np.cumsum(turn.astype(np.int64))) % 4
+        h_before = (h_after - turn) % 4
+        disp = (pre[:, None] * self.units[h_before] + post[:, None] * self.units[h_after]
+                + self.radius * (turn != 0)[:, None] * (self.units[h_before] + self.units[h_after]))
+        starts = self.position + self.pending * self.units[self.heading] + np.cumsum(disp, axis=0) - disp
+        at = starts + self.moves.label_at[codes][:, None] * self.units[h_before]
+        for (x, y), code in zip(at, codes):
+            anchor = self.moves.align[code]
+            anchor = "" if anchor == "start" else f' text-anchor="{anchor}"'
+            self.writer.write(f'<text x="{x:.1f}" y="{-y - 3:.1f}" fill="{self.colour}"{anchor}'
+                              f' font-family="{FONTNAME}" font-size="{FONTSIZE}pt">{chr(code)}</text>\n')
+
+    def finish(self, arrow_head: bool = False, arrow_colour: str = "#000") -> None:
+        """Write the remaining straight move and (optionally) the turtle's arrow head at the end."""
+        end = self.position + self.pending * self.units[self.heading]
+        self._emit(end[None, :], np.zeros(1, dtype=np.int64))
+        self.flush()
+        self.position, self.pending = end, 0.0
+        if arrow_head:
+            f = self.units[self.heading]
+            left = np.array([-f[1], f[0]])
+            pts = end + ARROW_SHAPE[:, :1] * f + ARROW_SHAPE[:, 1:] * left
+            points = " ".join(f"{_num(round(x, 3))},{_num(round(-y, 3))}" for x, y in pts)
+            self.writer.arrow = (f'<polygon points="{points}" stroke="{self.colour}" fill="{arrow_colour}"'
+                                 f' fill-rule="evenodd" stroke-linejoin="round"/>\n')
+            self.writer.include(pts[:, 0].min(), -pts[:, 1].max(), pts[:, 0].max(), -pts[:, 1].min())
+
+
+def draw_word(writer: SVGWriter, word, moves: MoveTable, initial_angle: float, radius: float,
+              lead: float = 0.0, tail: float = 0.0, pen_colour: str = "black", pen_width: float = 2.5,
+              arrow_head: bool = False, label: bool = False, tolerance: float = 0.0) -> None:
+    """
+    Trace `word` with the given moves (after a straight `lead`, before a straight `tail`) into `writer`,
+    simplifying sharp-cornered paths to within `tolerance`.
+    """
+    path = TurtlePath(writer, moves, initial_angle, radius, pen_colour, pen_width, tolerance=tolerance)
+    path.forward(lead)
+    for chunk in word_chunks(word):
+        path.feed(chunk, label=label)
+    path.forward(tail)
+    path.finish(arrow_head)
@@ -0,0 +1,181 @@
+"""
+Words stored as arrays of bytes instead of Python strings.
+
+A Word holds the ASCII codes of its symbols in a NumPy uint8 array, so letter-to-letter maps are
+bytes.translate tables and substitutions are a gather over the concatenated rule images. Words over
+{A,B,+,-} can be packed at four symbols per byte (PackedWord). Words compare equal to the strings
+they spell, and str(word) gives the string back.
+"""
+import numpy as np
+
+# 2-bit codes of the square-grid alphabet
+PACKED_ALPHABET = b"AB+-"
+_PACK = np.full(256, 255, dtype=np.uint8)
+_PACK[np.frombuffer(PACKED_ALPHABET, dtype=np.uint8)] = np.arange(4, dtype=np.uint8)
+_UNPACK = np.frombuffer(PACKED_ALPHABET, dtype=np.uint8)
+
+
+class Word:
+    __slots__ = ("codes",)
+
+    def __init__(self, word=""):
+        """
+        Parameters:
+        word: a str, bytes, uint8 array or Word.
+        """
+        if isinstance(word, Word):
+            codes = word.codes
+        elif isinstance(word, np.ndarray):
+            codes = word.astype(np.uint8, copy=False)
+        else:
+            codes = np.frombuffer(word.encode("ascii") if isinstance(word, str) else bytes(word), dtype=np.uint8)
+        self.codes = codes
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def __str__(self) -> str:
+        return self.codes.tobytes().decode("ascii")
+
+    def __repr__(self) -> str:
+        text = str(self[:40]) + ("..." if len(self) > 40 else "")
+        return f"Word({text!r}, length={len(self)})"
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (Word, str, bytes)):
+            other = Word(other).codes
+            return len(other) == len(self.codes) and bool(np.array_equal(self.codes, other))
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return hash(self.codes.tobytes())
+
+    def __getitem__(self, k):
+        if isinstance(k, slice):
+            return Word(self.codes[k])
+        return chr(self.codes[k])
+
+    def __iter__(self):
+        return iter(str(self))
+
+    def __add__(self, other):
+        return Word(np.concatenate([self.codes, Word(other).codes]))
+
+    def __radd__(self, other):
+        return Word(np.concatenate([Word(other).codes, self.codes]))
+
+    def tobytes(self) -> bytes:
+        return self.codes.tobytes()
+
+    def translate(self, table: bytes):
+        """Map every symbol through a 256-byte table from bytes.maketrans."""
+        return Word(np.frombuffer(self.codes.tobytes().translate(table), dtype=np.uint8))
+
+    def reverse(self):
+        return Word(self.codes[::-1])
+
+    def count(self, letter: str) -> int:
+        return int(np.count_nonzero(self.codes == ord(letter)))
+
+    def select(self, letters: str):
+        """The subword of the symbols in `letters`, e.g. select("RLS") drops a and v."""
+        keep = np.zeros(256, dtype=bool)
+        keep[np.frombuffer(letters.encode("ascii"), dtype=np.uint8)] = True
+        return Word(self.codes[keep[self.codes]])
+
+    def pack(self):
+        """Pack a word over {A,B,+,-} at four symbols per byte."""
+        return PackedWord.from_word(self)
+
+
+class PackedWord:
+    """A word over {A,B,+,-} at 2 bits per symbol (A=0, B=1, +=2, -=3), first symbol in the low bits."""
+    __slots__ = ("data", "length")
+
+    def __init__(self, data: np.ndarray, length: int):
+        self.data = data
+        self.length = length
+
+    @staticmethod
+    def _pack_codes(codes: np.ndarray) -> np.ndarray:
+        # bytes of four symbols each, the last one padded
+        symbols = _PACK[codes]
+        if len(symbols) and symbols.max() == 255:
+            raise ValueError("only words over {A,B,+,-} can be packed")
+        padded = np.zeros(-(-len(symbols) // 4) * 4, dtype=np.uint8)
+        padded[:len(symbols)] = symbols
+        quads = padded.reshape(-1, 4)
+        return quads[:, 0] | (quads[:, 1] << 2) | (quads[:, 2] << 4) | (quads[:, 3] << 6)
+
+    @classmethod
+    def from_word(cls, word):
+        codes = Word(word).codes
+        return cls(cls._pack_codes(codes), len(codes))
+
+    @classmethod
+    def from_chunks(cls, chunks, length: int):
+        """
+        Pack a word of `length` symbols given as consecutive chunks (strings or Words), writing each
+        chunk straight into the packed buffer. Every chunk but the last must be a multiple of 4 long.
+        """
+        data = np.zeros(-(-length // 4), dtype=np.uint8)
+        position = 0
+        for chunk in chunks:
+            if position % 4:
+                raise ValueError("only the last chunk may have a length that is not a multiple of 4")
+            codes = Word(chunk).codes
+            packed = cls._pack_codes(codes)
+            data[position // 4:position // 4 + len(packed)] = packed
+            position += len(codes)
+        if position != length:
+            raise ValueError(f"the chunks have {position} symbols, expected {length}")
+        return cls(data, length)
+
+    def __len__(self) -> int:
+        return self.length
+
+    @property
+    def nbytes(self) -> int:
+        return self.data.nbytes
+
+    def unpack(self) -> Word:
+        shifts = np.array([0, 2, 4, 6], dtype=np.uint8)
+        symbols = (self.data[:, None] >> shifts) & 3
+        return Word(_UNPACK[symbols.reshape(-1)[:self.length]])
+
+
+class GatherTable:
+    """
+    A substitution on bytes as one gather: the images of all 256 byte values (unmapped bytes map to
+    themselves) are concatenated, and the image of a word is read off at the offsets of its symbols.
+    """
+    def __init__(self, rules: dict):
+        images = [rules.get(chr(c), chr(c)).encode("latin-1") for c in range(256)]
+        self.lengths = np.array([len(image) for image in images], dtype=np.int64)
+        self.offsets = np.cumsum(self.lengths) - self.lengths
+        self.flat = np.frombuffer(b"".join(images), dtype=np.uint8)
+
+    def apply(self, codes: np.ndarray, chunk_size: int = 1 << 20) -> np.ndarray:
+        """The image of a uint8 array of symbols, computed `chunk_size` input symbols at a time."""
+        lengths = self.lengths[codes]
+        out = np.empty(int(lengths.sum()), dtype=np.uint8)
+        position = 0
+        for start in range(0, len(codes), chunk_size):
+            chunk = codes[start:start + chunk_size]
+            k = lengths[start:start + chunk_size]
+            total = int(k.sum())
+            # index into flat: the offset of each symbol's image, plus the position inside it
+            index = np.repeat(self.offsets[chunk] - (np.cumsum(k) - k), k)
+            index += np.arange(total)
+            np.take(self.flat, index, out=out[position:position + total])
+            position += total
+        return out
+
+
+def word_chunks(word, chunk_size: int = 1 << 20):
+    """Yield `word` (a string or Word, or an iterable of string chunks) as chunks of at most `chunk_size` symbols."""
+    if isinstance(word, (str, bytes, np.ndarray, Word)):
+        for start in range(0, len(word), chunk_size):
+            yield word[start:start + chunk_size]
+    else:
+        yield from word
@@ -1,83 +1,154 @@
 from manim import *
+import math
+import os
 import numpy as np
+from foldingcurves.cache import sequence_key
+from foldingcurves.geometry import turtle_end, turtle_vertices
+
+# generation geometry is kept here between runs, one directory per (rule_A, left_angle, right_angle)
+CACHE_DIR = os.path.join("media", "dragon_cache")
 
 def end(word, left_angle, right_angle):
-        x, y = 0, 0
-        angle = 0  # initial direction facing right
-        for cmd in word:
-            if cmd in "AB":
-                x += np.cos(np.radians(angle))
-                y += np.sin(np.radians(angle))
-            elif cmd == "-":
-                angle += left_angle
-            elif cmd == "+":
-                angle -= right_angle
-        return (x, y)
+    return turtle_end(word, left_angle, right_angle)
 
-def folding_morphism(word, rule_A):
+def inverse_rule(rule_A):
     invert = {"A": "B", "B": "A", "+":"-", "-":"+"}
-    rule_B = ''.join(invert[ch] for ch in reversed(rule_A))
-    rules = {"A": rule_A, "B": rule_B}
+    return ''.join(invert[ch] for ch in reversed(rule_A))
+
+def folding_morphism(word, rule_A):
+    rules = {"A": rule_A, "B": inverse_rule(rule_A)}
     return "".join(rules.get(c, c) for c in word)
 
-def manim_draw(instructions, step, initial_angle, left_angle, right_angle):
-    """Return a VMobject representing the entire curve as one continuous path."""
-    current_pos = ORIGIN + DOWN + 2*LEFT
-    current_angle = initial_angle
+class Generations:
+    """
+    Step headings of P^g(A) and P^g(B), built one generation from the previous one: the headings of
+    P^(g+1)(A) are those of P^g(c) for the letters c of rule_A, each shifted by the turn before c.
+    With whole-degree angles the headings are int16 multiples of gcd(left, right, 360), turned into
+    unit vectors by a lookup table; other angles are kept as float degrees.
+    """
+    def __init__(self, rule_A, left_angle, right_angle, cache_dir=CACHE_DIR):
+        self.rules = {"A": rule_A, "B": inverse_rule(rule_A)}
+        if float(left_angle).is_integer() and float(right_angle).is_integer():
+            unit = math.gcd(math.gcd(int(left_angle), int(right_angle)), 360)
+            self.modulus = 360 // unit
+            self.turns = {"-": int(left_angle) // unit, "+": -(int(right_angle) // unit)}
+            angles = np.radians(unit * np.arange(self.modulus))
+            self.table = np.column_stack([np.cos(angles), np.sin(angles)])
+            dtype = np.int16
+        else:
+            self.modulus = None
+            self.turns = {"-": float(left_angle), "+": -float(right_angle)}
+            self.table = None
+            dtype = np.float64
+        # generation 0: one step at heading 0, no turn
+        self.headings = [{"A": np.zeros(1, dtype=dtype), "B": np.zeros(1, dtype=dtype)}]
+        self.net = [{"A": 0, "B": 0}]
+        self.cache_dir = None
+        if cache_dir is not None:
+            # exact angles: float.hex distinguishes every float, so nearby angles never share a cache
+            key = f"{sequence_key(rule_A)}_{float(left_angle).hex()}_{float(right_angle).hex()}"
+            self.cache_dir = os.path.join(cache_dir, key)
+
+    def _path(self, g, letter):
+        return os.path.join(self.cache_dir, f"{g:03d}_{letter}.npy")
+
+    def _extend(self):
+        g = len(self.headings)
+        if self.cache_dir is not None and all(os.path.exists(self._path(g, c)) for c in "AB"):
+            headings = {c: np.load(self._path(g, c)) for c in "AB"}
+        else:
+            previous, net = self.headings[-1], self.net[-1]
+            headings = {}
+            for letter, rule in self.rules.items():
+                parts, turn = [], 0
+                for c in rule:
+                    if c in "AB":
+                        parts.append(previous[c] + turn)
+                        turn += net[c]
+                    else:
+                        turn += self.turns[c]
+                    if self.modulus is not None:
+                        turn %= self.modulus
+                headings[letter] = np.concatenate(parts)
+                if self.modulus is not None:
+                    headings[letter] %= self.modulus
+            if self.cache_dir is not None:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                for c in "AB":
+                    np.save(self._path(g, c) + f".{os.getpid()}.npy", headings[c])
+                    os.replace(self._path(g, c) + f".{os.getpid()}.npy", self._path(g, c))
+        self.headings.append(headings)
+        # net turn of P^g(c): the turns of its rule, each letter counted at the previous generation
+        net = {}
+        for letter, rule in self.rules.items():
+            turn = sum(self.net[-1][c] if c in "AB" else self.turns[c] for c in rule)
+            net[letter] = turn % self.modulus if self.modulus is not None else turn
+        self.net.append(net)
+
+    def directions(self, g, letter="A"):
+        """Unit vector of every step of P^g(letter), as a (k, 2) array."""
+        while len(self.headings) <= g:
+            self._extend()
+        headings = self.headings[g][letter]
+        if self.table is not None:
+            return self.table[headings]
+        angles = np.radians(headings)
+        return np.column_stack([np.cos(angles), np.sin(angles)])
+
+    def vertices(self, g, step=1.0, initial_angle=0.0, letter="A"):
+        """Vertices of the curve of P^g(letter), as a (k+1, 2) array starting at the origin."""
+        a = np.radians(initial_angle)
+        rotation = step * np.array([[np.cos(a), np.sin(a)], [-np.sin(a), np.cos(a)]])
+        directions = self.directions(g, letter)
+        vertices = np.zeros((len(directions) + 1, 2))
+        np.cumsum(directions @ rotation, axis=0, out=vertices[1:])
+        return vertices
+
+def vertex_path(vertices, start=ORIGIN + DOWN + 2*LEFT):
+    """Return a VMobject through the given (k, 2) vertices, as one continuous path."""
+    points = np.zeros((len(vertices), 3))
+    points[:, :2] = vertices
     path = VMobject()
     path.set_stroke(width=2)
     path.set_color(BLACK)
-    path.start_new_path(current_pos)
-
-    for cmd in instructions:
-        if cmd in "AB":
-            dir_vec = np.array([
-                np.cos(np.radians(current_angle)),
-                np.sin(np.radians(current_angle)),
-                0
-            ])
-            next_pos = current_pos + step * dir_vec
-            path.add_line_to(next_pos)
-            current_pos = next_pos
-        elif cmd == "-":
-            current_angle += left_angle
-        elif cmd == "+":
-            current_angle -= right_angle
-
+    path.set_points_as_corners(points + start)
     return path
 
+def manim_draw(instructions, step, initial_angle, left_angle, right_angle):
+    """Return a VMobject representing the entire curve as one continuous path."""
+    return vertex_path(turtle_vertices(instructions, left_angle, right_angle, initial_angle, step))
+
 class DragonCurveEvolution(Scene):
-    def construct(self):       
-        self.camera.background_color = WHITE 
+    def construct(self):
+        self.camera.background_color = WHITE
         # parameter, feel free to change!
         length = 5 # length of zeroth generation
         generations = 15 # last generation
-        left_angle = 90 
+        left_angle = 90
         right_angle = 90
         rule_A = "A+B"
         #rule_A = "A+B-A-B-A+B+A+B-A-B-A+B+A"
 
         x,y = end(rule_A, left_angle, right_angle)
         factor = np.sqrt(x**2 + y**2)
+        geometry = Generations(rule_A, left_angle, right_angle)
 
         # draw
         previous_curve = None
         initial_angle = 0
-        command = "A"
         for gen in range(generations+1):
             # compute parameters for this generation
-    
+
             initial_angle = -np.degrees(np.arctan2(y,x)) * gen
-            curve = manim_draw(command, length, initial_angle, left_angle, right_angle)
+            curve = vertex_path(geometry.vertices(gen, length, initial_angle))
 
             if previous_curve is None:
                 self.play(Create(curve), run_time=1 + gen * 0.1)
             else:
                 self.play(Transform(previous_curve, curve), run_time=1 + gen * 0.1)
-                curve = previous_curve  
+                curve = previous_curve
 
             previous_curve = curve
-            command = folding_morphism(command, rule_A)
-            length = length/factor 
-            
+            length = length/factor
+
         self.wait(2)
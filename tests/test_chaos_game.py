@@ -0,0 +1,41 @@
+import matplotlib
+matplotlib.use("Agg")
+import numpy as np
+import pytest
+from foldingcurves.squaregrid import FoldingSequence
+
+
+@pytest.fixture
+def reducible_ifs():
+    # edges 1 -> {1, 2, 3}, 2 -> {2, 2}, 3 -> {3, 3}: two closed classes below vertex 1
+    ifs = FoldingSequence("-++").to_graph_directed_ifs()
+    assert sorted(ifs.target[ifs.source == 1]) == [1, 2, 3]
+    return ifs
+
+
+@pytest.mark.parametrize("probs", [None, "spectral"])
+def test_every_vertex_gets_points(reducible_ifs, probs):
+    reducible_ifs.probs = probs
+    assert np.all(np.isfinite(reducible_ifs.edge_probabilities()))
+    labels, points = next(reducible_ifs.chaos_game(seed=0))
+    assert np.all(np.isfinite(points))
+    for v in reducible_ifs.vertices:
+        assert np.count_nonzero(labels == v) > 0
+
+
+def test_points_lie_on_their_attractor(reducible_ifs):
+    Ks = [np.zeros((1, 2)) for _ in reducible_ifs.vertices]
+    for _ in range(12):
+        Ks = reducible_ifs.contraction(Ks)
+    labels, points = next(reducible_ifs.chaos_game(seed=1))
+    for v in reducible_ifs.vertices:
+        mine = points[labels == v][:200]
+        distance = np.sqrt(((mine[:, None] - Ks[v - 1][None]) ** 2).sum(axis=-1)).min(axis=1)
+        assert distance.max() < 1e-2
+
+
+def test_draw_and_raster(reducible_ifs):
+    ax = reducible_ifs.draw(1, points=1000)
+    assert len(ax.collections[0].get_offsets()) == 1000
+    raster = reducible_ifs.raster(20000, size=64)
+    assert raster is not None
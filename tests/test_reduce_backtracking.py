@@ -0,0 +1,57 @@
+import random
+import pytest
+from foldingcurves.squaregrid import FoldingSequence
+from foldingcurves.word import Word
+
+
+def reduce_reference(s: FoldingSequence, w: str) -> str:
+    """Apply `_reduce_once` until nothing changes (the reducer's original definition)."""
+    out, changed = list(w), True
+    while changed:
+        out, changed = s._reduce_once(out)
+    return "".join(out)
+
+
+def random_words(count: int, max_length: int, seed: int) -> list:
+    rng = random.Random(seed)
+    return ["".join(rng.choice("RLSav") for _ in range(rng.randint(0, max_length))) for _ in range(count)]
+
+
+def random_sequences(count: int, max_length: int, seed: int) -> list:
+    rng = random.Random(seed)
+    return ["".join(rng.choice("+-") for _ in range(rng.randint(1, max_length))) for _ in range(count)]
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_random_words(seed):
+    s = FoldingSequence("+")
+    for w in random_words(500, 40, seed):
+        assert s.reduce_backtracking(w) == reduce_reference(s, w), w
+
+
+def test_word_input():
+    s = FoldingSequence("+")
+    for w in random_words(100, 40, 10):
+        reduced = s.reduce_backtracking(Word(w))
+        assert isinstance(reduced, Word)
+        assert str(reduced) == reduce_reference(s, w), w
+
+
+def test_nested_backtracking():
+    s = FoldingSequence("+")
+    for k in range(1, 20):
+        w = "L" * k + "v" + "R" * k
+        assert s.reduce_backtracking(w) == reduce_reference(s, w)
+
+
+@pytest.mark.parametrize("sequence", random_sequences(40, 16, 0))
+def test_boundary_inputs(sequence):
+    # the words reduced by _boundary_rules: CreateLeft/Right of P0(A), then R v invert(L) and its odd variant
+    s = FoldingSequence(sequence)
+    P0A = s.rules.P0["A"]
+    wR_tilde, wL_tilde = s.create_left(P0A), s.create_right(P0A)
+    wR_red, wL_red = s.reduce_backtracking(wR_tilde), s.reduce_backtracking(wL_tilde)
+    assert wR_red == reduce_reference(s, wR_tilde)
+    assert wL_red == reduce_reference(s, wL_tilde)
+    for w in (wR_red + "v" + s.inv_invert(wL_red), s.inv_invert(wL_red) + "v" + wR_red):
+        assert s.reduce_backtracking(w) == reduce_reference(s, w), w